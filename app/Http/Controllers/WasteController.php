@@ -7,6 +7,9 @@
 use Illuminate\Http\JsonResponse;
 use Illuminate\Support\Facades\Validator;
 use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Facades\Http;
+
+use function Illuminate\Support\defer;
 
 class WasteController extends Controller
 {
@@ -105,11 +108,13 @@ public function store(Request $request): JsonResponse
                 }
                 
                 Log::info('WasteController: All waste records created successfully', ['count' => count($createdWastes)]);
+                $this->notifyChanges(upserted: array_map(fn ($waste) => $waste->id, $createdWastes));
                 
                 return response()->json([
                     'success' => true,
                     'message' => 'Waste items created successfully',
-                    'data' => $createdWastes
+                    'data' => $createdWastes,
+                    'anomalies' => $this->scoreAnomalies($createdWastes)
                 ], 201);
                 
             } else {
@@ -132,11 +137,13 @@ public function store(Request $request): JsonResponse
 
                 $waste = Waste::create($validated);
                 Log::info('WasteController: Single waste record created', ['id' => $waste->id]);
+                $this->notifyChanges(upserted: [$waste->id]);
 
                 return response()->json([
                     'success' => true,
                     'message' => 'Waste item created successfully',
-                    'data' => $waste
+                    'data' => $waste,
+                    'anomalies' => $this->scoreAnomalies([$waste])
                 ], 201);
             }
             
@@ -226,6 +233,7 @@ public function update(Request $request, $id): JsonResponse
 
             $waste->update($validated);
             Log::info('WasteController: Waste updated successfully', ['id' => $id]);
+            $this->notifyChanges(upserted: [$waste->id]);
 
             return response()->json([
                 'success' => true,
@@ -276,6 +284,7 @@ public function destroy($id): JsonResponse
             $waste->delete();
             
             Log::info('WasteController: Waste deleted successfully', ['id' => $id]);
+            $this->notifyChanges(deleted: [$waste->id]);
 
             return response()->json([
                 'success' => true,
@@ -302,4 +311,77 @@ public function destroy($id): JsonResponse
             ], 500);
         }
     }
-}
\ No newline at end of file
+
+    /**
+     * Tell the ML service which rows changed so it can update its data without
+     * polling the table. Sent after the response has gone out, so unlike scoring
+     * it never delays the request; failures are only logged.
+     */
+    private function notifyChanges(array $upserted = [], array $deleted = []): void
+    {
+        $url = config('services.ml.url');
+        if (!$url) {
+            return;
+        }
+
+        defer(function () use ($url, $upserted, $deleted) {
+            try {
+                $response = Http::timeout(config('services.ml.timeout'))
+                    ->withHeaders(array_filter(['X-ML-Token' => config('services.ml.token')]))
+                    ->post(rtrim($url, '/') . '/api/ml/changes', [
+                        'upserted' => array_values($upserted),
+                        'deleted' => array_values($deleted),
+                    ]);
+
+                if (!$response->successful()) {
+                    Log::warning('WasteController: Change notification failed', ['status' => $response->status()]);
+                }
+            } catch (\Exception $e) {
+                Log::warning('WasteController: Change notification unavailable', ['error' => $e->getMessage()]);
+            }
+        });
+    }
+
+    /**
+     * Ask the ML service to score freshly stored records. Scoring is best effort
+     * and never blocks the write; null means the service was not consulted.
+     */
+    private function scoreAnomalies(array $wastes): ?array
+    {
+        $url = config('services.ml.url');
+        if (!$url) {
+            return null;
+        }
+
+        try {
+            $records = array_map(fn ($waste) => [
+                'id' => $waste->id,
+                'TypeOfWaste' => $waste->TypeOfWaste,
+                'Disposition' => $waste->Disposition,
+                'Weight' => $waste->Weight,
+                'Unit' => $waste->Unit,
+                'InputBy' => $waste->InputBy,
+                'created_at' => optional($waste->created_at)->toDateTimeString(),
+            ], $wastes);
+
+            $response = Http::timeout(config('services.ml.timeout'))
+                ->post(rtrim($url, '/') . '/api/ml/anomalies/score', ['records' => $records]);
+
+            if (!$response->successful()) {
+                Log::warning('WasteController: Anomaly scoring failed', ['status' => $response->status()]);
+                return null;
+            }
+
+            $results = $response->json('results', []);
+            $flagged = array_values(array_filter($results, fn ($result) => $result['is_anomaly'] ?? false));
+            if ($flagged) {
+                Log::warning('WasteController: Suspicious waste entries flagged', ['results' => $flagged]);
+            }
+
+            return $results;
+        } catch (\Exception $e) {
+            Log::warning('WasteController: Anomaly scoring unavailable', ['error' => $e->getMessage()]);
+            return null;
+        }
+    }
+}
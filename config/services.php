@@ -28,6 +28,12 @@
         'key' => env('RESEND_KEY'),
     ],
 
+    'ml' => [
+        'url' => env('ML_SERVICE_URL'),
+        'timeout' => env('ML_SERVICE_TIMEOUT', 2),
+        'token' => env('ML_SERVICE_TOKEN'),
+    ],
+
     'slack' => [
         'notifications' => [
             'bot_user_oauth_token' => env('SLACK_BOT_USER_OAUTH_TOKEN'),
@@ -0,0 +1,36 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('wastes', function (Blueprint $table) {
+            // Date, type and disposition filters of the ML service's /api/ml/* endpoints
+            $table->index('created_at');
+            $table->index('TypeOfWaste');
+            $table->index('Disposition');
+            // Delta loads ask for rows updated since the last one seen
+            $table->index('updated_at');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('wastes', function (Blueprint $table) {
+            $table->dropIndex(['created_at']);
+            $table->dropIndex(['TypeOfWaste']);
+            $table->dropIndex(['Disposition']);
+            $table->dropIndex(['updated_at']);
+        });
+    }
+};
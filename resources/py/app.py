@@ -1,76 +1,1425 @@
 # app.py - Flask ML Analytics API
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import mysql.connector
-from sklearn.ensemble import IsolationForest, RandomForestRegressor
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
-import joblib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import bisect
+import contextvars
+import cProfile
+import gzip
+import hashlib
+import hmac
+import importlib
+import io
+import json
+import os
+import pstats
+import queue
+import threading
+import time
 import warnings
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking for the category file
+    fcntl = None
+try:
+    import orjson
+except ImportError:  # optional: responses fall back to the standard json module
+    orjson = None
+try:
+    import brotli
+except ImportError:  # optional: clients asking for br get gzip instead
+    brotli = None
 warnings.filterwarnings('ignore')
 
+class LazyModule:
+    """Module stand-in that performs the real import on first attribute access
+    
+    pandas, sklearn and mysql.connector dominate start-up time, so they are only
+    imported once an analysis actually needs them (or warm_up preloads them).
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _lazy_import(self):
+        if self.__dict__['_module'] is None:
+            self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return self.__dict__['_module']
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_import(), attr)
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+joblib = LazyModule('joblib')
+mysql_connector = LazyModule('mysql.connector')
+mysql_pooling = LazyModule('mysql.connector.pooling')
+sk_ensemble = LazyModule('sklearn.ensemble')
+sk_cluster = LazyModule('sklearn.cluster')
+sk_preprocessing = LazyModule('sklearn.preprocessing')
+
+LAZY_MODULES = [pd, np, joblib, mysql_connector, mysql_pooling, sk_ensemble, sk_cluster, sk_preprocessing]
+
+def preload_dependencies():
+    """Import every lazily loaded dependency now, e.g. before serving traffic"""
+    for module in LAZY_MODULES:
+        module._lazy_import()
+
+# Prometheus text exposition of in-process metrics; every worker process keeps its own
+METRICS_PREFIX = 'smms_ml_'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Requests may ask for a profile (?profile=1 or X-ML-Profile: 1) only when this is on
+PROFILING_ENABLED = os.environ.get('ML_PROFILING', '0') == '1'
+PROFILE_TOP_FUNCTIONS = int(os.environ.get('ML_PROFILE_TOP_FUNCTIONS', 30))
+
+# Stage timings of the request being profiled, if any
+active_profile = contextvars.ContextVar('active_profile', default=None)
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms rendered in Prometheus text format"""
+
+    def __init__(self, prefix=METRICS_PREFIX, buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.kinds = {}
+        self.help = {}
+        self.reset()
+
+    def reset(self):
+        """Forget every recorded value, e.g. in a freshly forked worker"""
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, kind, text):
+        self.kinds[name] = kind
+        self.help[name] = text
+
+    def key(self, name, kind, labels):
+        self.kinds.setdefault(name, kind)
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            key = self.key(name, 'counter', labels)
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[self.key(name, 'gauge', labels)] = value
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            key = self.key(name, 'histogram', labels)
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            # Counts are kept per bucket and made cumulative when rendered
+            bucket = bisect.bisect_left(self.buckets, value)
+            if bucket < len(self.buckets):
+                histogram[0][bucket] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Time a hot-path stage; set info['rows'] inside the block to record its size"""
+        info = {}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('stage_duration_seconds', elapsed, stage=name)
+            if info.get('rows') is not None:
+                self.set('stage_rows', info['rows'], stage=name)
+                self.inc('stage_rows_total', info['rows'], stage=name)
+            profile = active_profile.get()
+            if profile is not None:
+                profile.append({'stage': name, 'ms': round(elapsed * 1000, 1), **info})
+
+    def format_labels(self, labels):
+        if not labels:
+            return ''
+        pairs = []
+        for label, value in labels:
+            value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(f'{label}="{value}"')
+        return '{' + ','.join(pairs) + '}'
+
+    def render(self):
+        with self.lock:
+            items = sorted(
+                (key, [list(value[0]), value[1], value[2]] if isinstance(value, list) else value)
+                for key, value in self.values.items()
+            )
+        lines = []
+        current = None
+        for (name, labels), value in items:
+            full_name = self.prefix + name
+            kind = self.kinds[name]
+            if name != current:
+                current = name
+                if name in self.help:
+                    lines.append(f'# HELP {full_name} {self.help[name]}')
+                lines.append(f'# TYPE {full_name} {kind}')
+            if kind == 'histogram':
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{full_name}_bucket{self.format_labels(labels + (("le", str(float(bound))),))} {cumulative}')
+                lines.append(f'{full_name}_bucket{self.format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{full_name}_sum{self.format_labels(labels)} {total}')
+                lines.append(f'{full_name}_count{self.format_labels(labels)} {count}')
+            else:
+                lines.append(f'{full_name}{self.format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+metrics.describe('stage_duration_seconds', 'histogram', 'Wall time of each hot-path stage')
+metrics.describe('stage_rows', 'gauge', 'Rows handled by the last run of each stage')
+metrics.describe('stage_rows_total', 'counter', 'Rows handled by each stage since start')
+metrics.describe('request_duration_seconds', 'histogram', 'HTTP request latency by endpoint')
+metrics.describe('requests_total', 'counter', 'HTTP requests by endpoint and status')
+metrics.describe('response_bytes_total', 'counter', 'HTTP response body bytes by endpoint, before compression')
+metrics.describe('compressed_bytes_total', 'counter', 'HTTP response body bytes sent compressed, by encoding')
+metrics.describe('db_checkout_seconds', 'histogram', 'Time to borrow and check a pooled database connection')
+metrics.describe('cache_requests_total', 'counter', 'Result cache lookups by analysis and outcome')
+metrics.describe('errors_total', 'counter', 'Errors that were logged and recovered from, by source')
+metrics.describe('frame_rows', 'gauge', 'Rows held in memory per frame')
+metrics.describe('frame_memory_bytes', 'gauge', 'Deep memory usage of the in-memory frames')
+metrics.describe('result_cache_entries', 'gauge', 'Entries in the result cache')
+metrics.describe('result_cache_hit_ratio', 'gauge', 'Result cache hits over lookups since start')
+metrics.describe('result_cache_evictions', 'gauge', 'Result cache entries evicted since start')
+metrics.describe('snapshot_age_seconds', 'gauge', 'Age of the latest background snapshot')
+metrics.describe('changes_applied_total', 'counter', 'Row ids applied from the change journal')
+metrics.describe('stream_clients', 'gauge', 'Connected /api/ml/stream clients')
+metrics.describe('result_cache_coalesced', 'gauge', 'Result cache misses that waited on an identical computation')
+metrics.describe('admission_wait_seconds', 'histogram', 'Time requests to expensive endpoints waited for a slot')
+metrics.describe('requests_shed_total', 'counter', 'Requests refused with 503, by endpoint, limit and reason')
+metrics.describe('admission_active', 'gauge', "Requests running per expensive endpoint, and across them as 'all'")
+metrics.describe('admission_waiting', 'gauge', "Requests waiting for a slot per expensive endpoint, and across them as 'all'")
+
+# Sorted keys match what Flask's default provider sends
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS) if orjson else 0
+
+def json_default(obj):
+    """numpy and pandas values that reach a response without being converted first"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def encode_json(obj):
+    """Compact JSON text, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS).decode()
+    return json.dumps(obj, default=json_default, sort_keys=True, separators=(',', ':'))
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider using encode_json, with serialization recorded as a stage"""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.stage('serialize'):
+            # Pretty-printed debug responses go through the json module's indent support
+            if kwargs.get('indent') is None:
+                return encode_json(obj)
+            kwargs.setdefault('default', json_default)
+            return super().dumps(obj, **kwargs)
+
+def frame_records(frame):
+    """Rows of a frame as dicts of plain Python values, built column by column"""
+    columns = list(frame.columns)
+    values = [frame[col].tolist() for col in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+def frame_columns(frame):
+    """A frame as {column: [values]}, the most compact JSON form for long results"""
+    return {col: frame[col].tolist() for col in frame.columns}
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
-class WasteMLAnalytics:
-    def __init__(self):
-        self.scaler = StandardScaler()
-        self.label_encoders = {}
-        self.models = {}
-        self.load_models()
+# Database settings share the Laravel .env names so both apps point at the same DB
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', '127.0.0.1'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'database': os.environ.get('DB_DATABASE', 'SMMS'),
+    'user': os.environ.get('DB_USERNAME', 'root'),
+    'password': os.environ.get('DB_PASSWORD', ''),
+    'connection_timeout': int(os.environ.get('ML_DB_CONNECT_TIMEOUT', 10)),
+}
+DB_POOL_SIZE = int(os.environ.get('ML_DB_POOL_SIZE', 5))
+DB_CHECKOUT_TIMEOUT = float(os.environ.get('ML_DB_CHECKOUT_TIMEOUT', 10))
+DB_QUERY_TIMEOUT = float(os.environ.get('ML_DB_QUERY_TIMEOUT', 30))
+
+class DatabasePool:
+    """Bounded pool of MySQL connections shared by every analytics instance"""
+
+    def __init__(self, config, size=5, checkout_timeout=10, query_timeout=30):
+        self.config = config
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.query_timeout = query_timeout
+        self.pool = None
+        self.lock = threading.Lock()
+        # mysql.connector raises as soon as the pool is empty, so callers queue here instead
+        self.slots = threading.BoundedSemaphore(size)
+
+    def get_pool(self):
+        """Create the pool on first use so importing the app never touches the DB"""
+        with self.lock:
+            if self.pool is None:
+                self.pool = mysql_pooling.MySQLConnectionPool(
+                    pool_name='smms_ml',
+                    pool_size=self.size,
+                    pool_reset_session=True,
+                    **self.config
+                )
+            return self.pool
+
+    def close(self):
+        """Close idle pooled connections, e.g. in the master before workers fork"""
+        with self.lock:
+            if self.pool is not None:
+                # mysql.connector has no public API for draining a pool
+                self.pool._remove_connections()
+                self.pool = None
+
+    def after_fork(self):
+        """Forget connections inherited from the parent; each process opens its own"""
+        self.pool = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(self.size)
+
+    def check_connection(self, connection):
+        """Make sure a pooled connection is alive, reconnecting if it went stale"""
+        connection.ping(reconnect=True, attempts=2, delay=0)
+        if self.query_timeout:
+            try:
+                cursor = connection.cursor()
+                cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(self.query_timeout * 1000)}")
+                cursor.close()
+            except mysql_connector.Error:
+                # MariaDB and old MySQL versions do not support this variable
+                pass
+
+    @contextmanager
+    def connection(self):
+        """Borrow a healthy connection and return it to the pool afterwards"""
+        if not self.slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f"No database connection available after {self.checkout_timeout}s")
+        connection = None
+        try:
+            start = time.perf_counter()
+            connection = self.get_pool().get_connection()
+            self.check_connection(connection)
+            metrics.observe('db_checkout_seconds', time.perf_counter() - start)
+            yield connection
+        finally:
+            if connection is not None:
+                connection.close()
+            self.slots.release()
+
+db_pool = DatabasePool(DB_CONFIG, DB_POOL_SIZE, DB_CHECKOUT_TIMEOUT, DB_QUERY_TIMEOUT)
+
+UNIT_FACTORS = {
+    'lbs': 0.453592, 'lb': 0.453592,
+    'tons': 1000, 'ton': 1000,
+    'g': 0.001, 'grams': 0.001,
+    'kg': 1, 'kilograms': 1
+}
+
+# 'parallel' runs the independent analyses of /api/ml/analytics on a thread pool
+ANALYSIS_EXECUTION = os.environ.get('ML_ANALYSIS_EXECUTION', 'parallel')
+ANALYSIS_WORKERS = int(os.environ.get('ML_ANALYSIS_WORKERS', 5))
+# n_jobs for the RandomForest and IsolationForest fits
+ML_N_JOBS = int(os.environ.get('ML_N_JOBS', -1))
+
+analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix='analysis')
+
+MODEL_DIR = os.environ.get('ML_MODEL_DIR', 'models')
+
+FORECAST_FEATURES = ['day_of_week', 'month', 'days_since_start', 
+                     'weight_lag_1', 'weight_lag_3', 'weight_lag_7',
+                     'count_lag_1', 'count_lag_3', 'count_lag_7',
+                     'weight_ma_3', 'weight_ma_7']
+
+# Bumped whenever the meaning of a forecasting feature changes
+FORECAST_SCHEMA = 3
+# 'incremental' folds new days into a MiniBatchKMeans, 'full' refits KMeans on every call
+CLUSTERING_MODE = os.environ.get('ML_CLUSTERING_MODE', 'incremental')
+# 'memory' builds /api/ml/summary from the in-memory rollup, 'database' streams the table in chunks
+SUMMARY_SOURCE = os.environ.get('ML_SUMMARY_SOURCE', 'memory')
+
+# Values of ?breakdown= on /api/ml/predictions and the columns they split by
+BREAKDOWN_COLUMNS = {'type': 'TypeOfWaste', 'disposition': 'Disposition'}
+MAX_FORECAST_DAYS = int(os.environ.get('ML_MAX_FORECAST_DAYS', 365))
+# Comma-separated filter parameters of the /api/ml/* endpoints and the columns they match
+FILTER_COLUMNS = {'type': 'TypeOfWaste', 'disposition': 'Disposition', 'input_by': 'InputBy'}
+# Filtered slices of the prepared frame kept per process
+FILTERED_SLICES = int(os.environ.get('ML_FILTERED_SLICES', 16))
+
+# Fields of each /api/ml/anomalies entry, in column order for ?format=columns
+ANOMALY_FIELDS = ['id', 'date', 'waste_type', 'weight_kg', 'disposition', 'user', 'anomaly_score', 'reason']
+# Entries per page when ?limit= is not given, the top 20 the endpoint always returned
+ANOMALY_PAGE_SIZE = int(os.environ.get('ML_ANOMALY_PAGE_SIZE', 20))
+# Entries per chunk written by ?stream=1
+STREAM_CHUNK_ROWS = int(os.environ.get('ML_STREAM_CHUNK_ROWS', 5000))
+# JSON bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get('ML_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('ML_GZIP_LEVEL', 5))
+BROTLI_QUALITY = int(os.environ.get('ML_BROTLI_QUALITY', 4))
+
+def parse_filters(args):
+    """Filters from ?from=&to= (YYYY-MM-DD, inclusive) and the FILTER_COLUMNS parameters
     
-    def connect_to_database(self):
-        """Connect to your Laravel MySQL database"""
+    Raises ValueError for malformed dates.
+    """
+    filters = {}
+    for name in ['from', 'to']:
+        if args.get(name):
+            filters[name] = pd.Timestamp(datetime.strptime(args[name], '%Y-%m-%d'))
+    if 'from' in filters and 'to' in filters and filters['from'] > filters['to']:
+        raise ValueError("'from' must not be after 'to'")
+    for name, col in FILTER_COLUMNS.items():
+        values = [v.strip() for v in args.get(name, '').split(',') if v.strip()]
+        if values:
+            filters[col] = tuple(sorted(set(values)))
+    return filters
+
+def parse_page(args, default_limit):
+    """(offset, limit) from ?offset=&limit=; limit=all means no limit (None)
+    
+    Raises ValueError for values that are not non-negative integers.
+    """
+    try:
+        offset = int(args.get('offset', 0))
+        limit = args.get('limit', default_limit)
+        limit = None if limit == 'all' else int(limit)
+    except ValueError:
+        raise ValueError("'offset' and 'limit' must be integers (or limit=all)")
+    if offset < 0 or (limit is not None and limit < 1):
+        raise ValueError("'offset' must be 0 or more and 'limit' at least 1")
+    return offset, limit
+
+SCORE_COLUMNS = ['id', 'TypeOfWaste', 'Disposition', 'Weight', 'Unit', 'InputBy', 'created_at']
+
+def score_frame(records):
+    """Posted waste records as a frame with Weight numeric and created_at parsed
+    
+    Raises ValueError unless records is a list of objects whose Weight is a
+    non-negative number and whose created_at, when given, is a date.
+    """
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError('Records must be a list of objects')
+    df = pd.DataFrame(records, columns=SCORE_COLUMNS)
+    
+    weights = pd.to_numeric(df['Weight'], errors='coerce')
+    bad = weights.isna() | (weights < 0)
+    if bad.any():
+        raise ValueError(f"Record {int(bad.to_numpy().argmax())}: 'Weight' must be a non-negative number")
+    df['Weight'] = weights
+    
+    # Offsets are folded into UTC; timestamps without one are kept as they are
+    created = pd.to_datetime(df['created_at'], errors='coerce', format='mixed', utc=True).dt.tz_localize(None)
+    bad = created.isna() & df['created_at'].notna()
+    if bad.any():
+        raise ValueError(f"Record {int(bad.to_numpy().argmax())}: 'created_at' is not a valid date")
+    # Records scored at write time may not carry a timestamp yet
+    df['created_at'] = created.fillna(pd.Timestamp.now())
+    return df
+
+def filter_params(filters):
+    """Filters as the plain strings used in cache keys and responses"""
+    params = {}
+    for name, value in filters.items():
+        params[name] = value.strftime('%Y-%m-%d') if name in ('from', 'to') else ','.join(value)
+    return params
+
+def filter_mask(df, filters):
+    """Rows of a frame with a normalized 'date' column (prepared rows or a rollup) that match"""
+    mask = pd.Series(True, index=df.index)
+    if 'from' in filters:
+        mask &= df['date'] >= filters['from']
+    if 'to' in filters:
+        mask &= df['date'] <= filters['to']
+    for col in FILTER_COLUMNS.values():
+        if col in filters:
+            mask &= df[col].isin(filters[col])
+    return mask
+
+def filter_sql(filters):
+    """WHERE clause and params selecting the same rows as filter_mask, for the indexed columns"""
+    conditions, params = [], []
+    if 'from' in filters:
+        conditions.append('created_at >= %s')
+        params.append(filters['from'].to_pydatetime())
+    if 'to' in filters:
+        conditions.append('created_at < %s')
+        params.append((filters['to'] + pd.Timedelta(days=1)).to_pydatetime())
+    for col in FILTER_COLUMNS.values():
+        if col in filters:
+            conditions.append(f"{col} IN ({', '.join(['%s'] * len(filters[col]))})")
+            params.extend(filters[col])
+    if not conditions:
+        return '', ()
+    return ' WHERE ' + ' AND '.join(conditions), tuple(params)
+
+def forest_predict(model, X):
+    """Mean of the trees of a fitted forest, skipping sklearn's per-call validation
+    
+    Recursive forecasts predict a handful of rows hundreds of times, where
+    RandomForestRegressor.predict spends most of its time on overhead.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators:
+        return np.asarray(model.predict(X), dtype=float)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    total = np.zeros(X.shape[0])
+    for tree in estimators:
+        total += tree.tree_.predict(X)[:, 0]
+    return total / len(estimators)
+
+def continuous_days(daily_data, end=None):
+    """A daily series with a row for every calendar day up to end, zero where nothing was logged
+    
+    Lags and moving averages count rows, so they only mean "N days back" on a
+    series without gaps.
+    """
+    if daily_data.empty:
+        return daily_data.reset_index(drop=True)
+    days = pd.date_range(daily_data['date'].min(), daily_data['date'].max() if end is None else end, freq='D')
+    return (daily_data.set_index('date').reindex(days, fill_value=0)
+            .rename_axis('date').reset_index())
+
+def series_features(daily_data, start_date=None):
+    """Build the forecasting features for one daily series (date, total_weight, item_count)"""
+    daily_data = continuous_days(daily_data.sort_values('date'))
+    if start_date is None:
+        start_date = daily_data['date'].min()
+    
+    # Create features for time series
+    daily_data['day_of_week'] = daily_data['date'].dt.dayofweek
+    daily_data['month'] = daily_data['date'].dt.month
+    daily_data['days_since_start'] = (daily_data['date'] - start_date).dt.days
+    
+    # Create lagged features
+    for lag in [1, 3, 7]:
+        daily_data[f'weight_lag_{lag}'] = daily_data['total_weight'].shift(lag)
+        daily_data[f'count_lag_{lag}'] = daily_data['item_count'].shift(lag)
+    
+    # Moving averages of the days before, so the target never feeds its own feature
+    previous = daily_data['total_weight'].shift(1)
+    daily_data['weight_ma_3'] = previous.rolling(3).mean()
+    daily_data['weight_ma_7'] = previous.rolling(7).mean()
+    
+    return daily_data
+
+def fit_forecaster(daily_data, n_jobs=1):
+    """Fit RandomForest weight and count forecasters on one daily series, or None if it is too short"""
+    daily_data = series_features(daily_data)
+    if len(daily_data) < 14:  # Need minimum data
+        return None
+    
+    # Remove rows with NaN values
+    training_data = daily_data.dropna()
+    if len(training_data) < 7:
+        return None
+    
+    X = training_data[FORECAST_FEATURES]
+    y_weight = training_data['total_weight']
+    y_count = training_data['item_count']
+    
+    # Train models
+    rf_weight = sk_ensemble.RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    rf_count = sk_ensemble.RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    
+    rf_weight.fit(X, y_weight)
+    rf_count.fit(X, y_count)
+    
+    # Forecasts predict a single row at a time, where worker threads only add overhead
+    rf_weight.set_params(n_jobs=1)
+    rf_count.set_params(n_jobs=1)
+    
+    return {
+        'weight_model': rf_weight,
+        'count_model': rf_count,
+        'model_type': 'random_forest',
+        'feature_cols': list(FORECAST_FEATURES),
+        'feature_schema': FORECAST_SCHEMA,
+        'start_date': daily_data['date'].min(),
+        'trained_at': datetime.now().isoformat(),
+        'training_days': int(len(training_data))
+    }
+
+class SeasonalNaiveModel:
+    """Predicts the value from the same weekday a week earlier"""
+
+    def __init__(self, column):
+        self.column = FORECAST_FEATURES.index(column)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float)[:, self.column]
+
+def fit_series_forecaster(daily_data):
+    """Forecaster for one breakdown series, falling back to seasonal-naive for short histories"""
+    forecaster = fit_forecaster(daily_data)
+    if forecaster is not None:
+        return forecaster
+    return {
+        'weight_model': SeasonalNaiveModel('weight_lag_7'),
+        'count_model': SeasonalNaiveModel('count_lag_7'),
+        'model_type': 'seasonal_naive',
+        'feature_cols': list(FORECAST_FEATURES),
+        'feature_schema': FORECAST_SCHEMA,
+        'start_date': daily_data['date'].min(),
+        'trained_at': datetime.now().isoformat(),
+        'training_days': int(len(daily_data))
+    }
+
+def series_fingerprint(daily_data):
+    """Stable hash of a daily series, used to skip refitting series that did not change
+    
+    Only days with records count: the zero-filled days that carry every series
+    up to the latest date grow by one each day and would otherwise change every
+    fingerprint, refitting series that got no new data. Weights are rounded so
+    that summing the same rows in another order gives the same hash.
+    """
+    observed = daily_data.loc[daily_data['item_count'] > 0, ['date', 'total_weight', 'item_count']]
+    hashed = pd.util.hash_pandas_object(observed.round({'total_weight': 6}), index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+class ForecastState:
+    """Ring buffers of the last 7 daily weights and counts for one or more series"""
+
+    WINDOW = 7
+
+    def __init__(self, weights, counts):
+        self.size = len(weights)
+        self.weights = np.zeros((self.size, self.WINDOW))
+        self.counts = np.zeros((self.size, self.WINDOW))
+        for i, (w, c) in enumerate(zip(weights, counts)):
+            # Right-align the history so the newest value sits in the last slot
+            w = np.asarray(w, dtype=float)[-self.WINDOW:]
+            c = np.asarray(c, dtype=float)[-self.WINDOW:]
+            self.weights[i, self.WINDOW - len(w):] = w
+            self.counts[i, self.WINDOW - len(c):] = c
+        # Slot the next value is written to, which always holds the oldest one
+        self.head = 0
+
+    def slots(self, n):
+        """Indexes of the last n values, newest first"""
+        return [(self.head - k) % self.WINDOW for k in range(1, n + 1)]
+
+    def features(self):
+        features = {}
+        for lag in [1, 3, 7]:
+            slot = self.slots(lag)[-1]
+            features[f'weight_lag_{lag}'] = self.weights[:, slot]
+            features[f'count_lag_{lag}'] = self.counts[:, slot]
+        features['weight_ma_3'] = self.weights[:, self.slots(3)].mean(axis=1)
+        features['weight_ma_7'] = self.weights.mean(axis=1)
+        return features
+
+    def push(self, weights, counts):
+        self.weights[:, self.head] = weights
+        self.counts[:, self.head] = counts
+        self.head = (self.head + 1) % self.WINDOW
+
+def strip_models(bundle):
+    """Bundle contents without the fitted model objects"""
+    if isinstance(bundle, dict):
+        return {k: strip_models(v) for k, v in bundle.items() if not k.endswith('_model')}
+    return bundle
+
+class ModelRegistry:
+    """Versioned model bundles on disk with a pointer to the current version"""
+
+    def __init__(self, root, keep_versions=10):
+        self.root = root
+        self.keep_versions = keep_versions
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def pointer_path(self, name):
+        return os.path.join(self.root, f'{name}_current.json')
+
+    def bundle_path(self, name, version):
+        return os.path.join(self.root, name, f'v{version}.joblib')
+
+    def current_version(self, name):
+        """Version number the pointer file refers to, or None"""
         try:
-            connection = mysql.connector.connect(
-               host='127.0.0.1',  # Update with your actual DB host
-            database='SMMS',  # Update from 'your_waste_db' to your actual database name
-            user='root',  # Update from 'your_username' to your actual DB username
-            password=''  # Update with your DB password
-            )
-            return connection
+            with open(self.pointer_path(name)) as f:
+                return json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def versions(self, name):
+        """All saved versions of a model, oldest first"""
+        try:
+            files = os.listdir(os.path.join(self.root, name))
+        except OSError:
+            return []
+        return sorted(int(f[1:-7]) for f in files if f.startswith('v') and f.endswith('.joblib'))
+
+    def save(self, name, bundle):
+        """Store a bundle as the next version and point current at it
+        
+        Every worker process saves into the same directory, so picking the
+        version and writing both files happen under a file lock, and each file
+        is written to a temporary name and renamed into place whole.
+        """
+        with self.lock, exclusive_file_lock(os.path.join(self.root, name)):
+            existing = self.versions(name)
+            version = existing[-1] + 1 if existing else 1
+            bundle['version'] = version
+            os.makedirs(os.path.join(self.root, name), exist_ok=True)
+            path = self.bundle_path(name, version)
+            temp = f'{path}.{os.getpid()}.tmp'
+            joblib.dump(bundle, temp)
+            os.replace(temp, path)
+
+            # Metadata only, so the pointer can be read without unpickling models
+            metadata = json.loads(json.dumps(strip_models(bundle), default=str))
+            pointer = self.pointer_path(name)
+            temp = f'{pointer}.{os.getpid()}.tmp'
+            with open(temp, 'w') as f:
+                json.dump(metadata, f, indent=2)
+            os.replace(temp, pointer)
+
+            self.cache[name] = bundle
+            self.prune(name, existing + [version])
+            return version
+
+    def fit_lock(self, name):
+        """Lock held across processes while deciding whether to fit a new version and fitting it
+        
+        Separate from the save lock, which the fit saves under. Whoever waits
+        on it should re-read the current version before fitting.
+        """
+        return exclusive_file_lock(os.path.join(self.root, f'{name}_fit'))
+
+    def prune(self, name, versions):
+        """Keep only the newest keep_versions bundles on disk"""
+        for old in versions[:-self.keep_versions]:
+            try:
+                os.remove(self.bundle_path(name, old))
+            except OSError:
+                pass
+
+    def load_current(self, name):
+        """Current bundle, unpickled at most once per version"""
+        version = self.current_version(name)
+        if version is None:
+            return None
+        with self.lock:
+            cached = self.cache.get(name)
+            if cached is not None and cached.get('version') == version:
+                return cached
+            try:
+                with metrics.stage('model_load') as stage:
+                    bundle = joblib.load(self.bundle_path(name, version))
+                    stage['model'] = name
+            except Exception as e:
+                print(f"Model load error for {name} v{version}: {e}")
+                metrics.inc('errors_total', source='model_load')
+                return cached
+            self.cache[name] = bundle
+            return bundle
+
+model_registry = ModelRegistry(MODEL_DIR, int(os.environ.get('ML_MODEL_KEEP_VERSIONS', 10)))
+
+ENCODED_COLUMNS = ['TypeOfWaste', 'Disposition', 'InputBy']
+
+@contextmanager
+def exclusive_file_lock(path):
+    """Exclusive lock across processes, held through a companion .lock file"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class CategoryRegistry:
+    """Append-only category codes persisted to disk and shared by every worker"""
+
+    def __init__(self, path):
+        self.path = path
+        self.codes = {}
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def reload(self, force=False):
+        """Pick up codes other workers appended since the last read
+        
+        The mtime check is only a shortcut: two writes within one timestamp
+        tick look unchanged, so callers about to append pass force=True.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self.mtime and not force:
+            return
+        with open(self.path) as f:
+            saved = json.load(f)
+        # Codes are only ever appended, so merging can never renumber a value
+        for col, mapping in saved.items():
+            self.codes.setdefault(col, {}).update(mapping)
+        self.mtime = mtime
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.codes, f, indent=2, sort_keys=True)
+        os.replace(self.path + '.tmp', self.path)
+        self.mtime = os.path.getmtime(self.path)
+
+    def file_lock(self):
+        """Exclusive lock across processes while new codes are appended"""
+        return exclusive_file_lock(self.path)
+
+    def codes_for(self, col, labels):
+        """Codes for labels, appending any that have never been seen"""
+        with self.lock:
+            self.reload()
+            mapping = self.codes.setdefault(col, {})
+            if any(label not in mapping for label in labels):
+                with self.file_lock():
+                    self.reload(force=True)
+                    mapping = self.codes.setdefault(col, {})
+                    for label in labels:
+                        if label not in mapping:
+                            mapping[label] = len(mapping)
+                    self.save()
+            return [mapping[label] for label in labels]
+
+    def lookup(self, col, labels):
+        """Codes for labels without recording new ones; unseen labels get the Unknown code"""
+        with self.lock:
+            self.reload()
+            mapping = self.codes.get(col, {})
+            unknown = mapping.get('Unknown', -1)
+            return [mapping.get(label, unknown) for label in labels]
+
+    def encode(self, col, values, append=True):
+        """Vectorized codes for a column; missing values encode as Unknown
+        
+        With append=False unseen labels also encode as Unknown and the
+        registry is left untouched, e.g. for client-supplied records.
+        """
+        values = pd.Categorical(values)
+        labels = [str(v) for v in values.categories] + ['Unknown']
+        codes = self.codes_for(col, labels) if append else self.lookup(col, labels)
+        lookup = np.array(codes, dtype='int64')
+        # Missing values have categorical code -1, which picks the trailing Unknown
+        return lookup[values.codes]
+
+category_registry = CategoryRegistry(os.path.join(MODEL_DIR, 'categories.json'))
+
+# Column names as created by the Laravel migrations
+WASTE_COLUMNS = """id, TypeOfWaste, Disposition, Weight, Unit, InputBy,
+               Verifiedby AS VerifiedBy, created_at, updated_at"""
+
+# Low-cardinality string columns kept as pandas categoricals
+CATEGORICAL_COLUMNS = ['TypeOfWaste', 'Disposition', 'Unit', 'InputBy']
+INGEST_CHUNK_SIZE = int(os.environ.get('ML_INGEST_CHUNK_SIZE', 50000))
+
+def compact_frame(df):
+    """Downcast numerics and store repeated strings as categoricals"""
+    df['id'] = pd.to_numeric(df['id'], downcast='unsigned')
+    df['Weight'] = pd.to_numeric(df['Weight'], errors='coerce', downcast='float')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+def concat_frames(frames):
+    """Concatenate compacted frames without falling back to object columns"""
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        return None
+    for col in CATEGORICAL_COLUMNS:
+        # Categoricals only survive concat when every frame shares the same categories
+        columns = [f[col] for f in frames if col in f.columns]
+        if len(columns) == len(frames):
+            categories = pd.api.types.union_categoricals(
+                [c.astype('category') for c in columns]
+            ).categories
+            for f in frames:
+                f[col] = f[col].astype(pd.CategoricalDtype(categories))
+    return pd.concat(frames, ignore_index=True)
+
+class WasteAggregates:
+    """Running daily, hourly and per-type totals folded in one chunk at a time"""
+
+    def __init__(self):
+        self.daily = None
+        self.hourly = None
+        self.by_type = None
+        self.rows = 0
+
+    def merge(self, running, part):
+        return part if running is None else running.add(part, fill_value=0)
+
+    def fold(self, chunk):
+        """Add a preprocessed chunk (weight_kg, date, hour) to the totals"""
+        if chunk is None or chunk.empty:
+            return
+        self.rows += len(chunk)
+        for attr, key in [('daily', 'date'), ('hourly', 'hour'), ('by_type', 'TypeOfWaste')]:
+            part = chunk.groupby(key, observed=True)['weight_kg'].agg(['sum', 'count'])
+            setattr(self, attr, self.merge(getattr(self, attr), part))
+
+    def records(self, totals, key):
+        if totals is None:
+            return []
+        totals = totals.sort_index().reset_index()
+        totals.columns = [key, 'total_weight', 'item_count']
+        totals['total_weight'] = totals['total_weight'].round(2)
+        totals['item_count'] = totals['item_count'].astype(int)
+        return totals.to_dict('records')
+
+    def to_dict(self):
+        daily = self.records(self.daily, 'date')
+        for row in daily:
+            row['date'] = row['date'].strftime('%Y-%m-%d')
+        return {
+            'total_records': self.rows,
+            'daily': daily,
+            'hourly': self.records(self.hourly, 'hour'),
+            'by_type': self.records(self.by_type, 'waste_type')
+        }
+
+ROLLUP_KEYS = ['date', 'TypeOfWaste', 'Disposition', 'InputBy']
+
+def rollup_frame(df):
+    """Collapse rows with weight_kg and date to one row per ROLLUP_KEYS combination"""
+    rollup = df.groupby(ROLLUP_KEYS, dropna=False, observed=True, sort=False)['weight_kg'].agg(
+        weight_kg='sum', count='size'
+    ).reset_index()
+    for col in ROLLUP_KEYS[1:]:
+        rollup[col] = rollup[col].astype(object)
+    return rollup
+
+def combine_rollups(parts):
+    """Sum rollup frames (negative counts subtract rows) and drop emptied keys"""
+    parts = [p for p in parts if p is not None and not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=ROLLUP_KEYS + ['weight_kg', 'count'])
+    combined = pd.concat(parts, ignore_index=True)
+    combined = combined.groupby(ROLLUP_KEYS, dropna=False, sort=False)[['weight_kg', 'count']].sum().reset_index()
+    return combined[combined['count'] > 0].reset_index(drop=True)
+
+def rollup_totals(rollup, keys):
+    """Totals of a rollup grouped by some of its keys, sorted by those keys"""
+    return rollup.groupby(keys)[['weight_kg', 'count']].sum().reset_index()
+
+class WasteRollup:
+    """Daily x type x disposition x user totals kept in step with the frame store"""
+
+    def __init__(self, prepare):
+        # prepare turns raw rows into ROLLUP_KEYS plus weight_kg
+        self.prepare = prepare
+        self.table = None
+        self.lock = threading.Lock()
+
+    def on_change(self, removed=None, added=None, reset=False):
+        """Apply rows leaving and entering the store"""
+        parts = [] if reset or self.table is None else [self.table]
+        if removed is not None and not removed.empty:
+            part = rollup_frame(self.prepare(removed))
+            part[['weight_kg', 'count']] *= -1
+            parts.append(part)
+        if added is not None and not added.empty:
+            parts.append(rollup_frame(self.prepare(added)))
+        table = combine_rollups(parts)
+        # Swapped in whole, so snapshots handed out earlier never change underneath readers
+        with self.lock:
+            self.table = table
+
+    def snapshot(self):
+        with self.lock:
+            return self.table
+
+# Row changes pushed by Laravel go through a journal file so every worker process sees them
+CHANGE_JOURNAL = os.environ.get('ML_CHANGE_JOURNAL', os.path.join(MODEL_DIR, 'changes.log'))
+CHANGE_JOURNAL_MAX_BYTES = int(os.environ.get('ML_CHANGE_JOURNAL_MAX_BYTES', 1_000_000))
+CHANGE_POLL_INTERVAL = float(os.environ.get('ML_CHANGE_POLL_INTERVAL', 1))
+# With the feed trusted, the database is only checked this often for writes it missed
+CHANGE_FEED = os.environ.get('ML_CHANGE_FEED', '0') == '1'
+CHANGE_FEED_VERIFY_INTERVAL = float(os.environ.get('ML_CHANGE_FEED_VERIFY_INTERVAL', 300))
+# Shared secret Laravel sends in X-ML-Token when posting changes (its ML_SERVICE_TOKEN);
+# unset, pushed changes are refused and the table is polled as before
+CHANGE_TOKEN = os.environ.get('ML_CHANGE_TOKEN')
+# Ids a single change post may carry; larger writes are left to the delta loads
+CHANGE_MAX_IDS = int(os.environ.get('ML_CHANGE_MAX_IDS', 1000))
+
+class WasteFrameStore:
+    """In-process copy of the wastes table kept fresh with delta queries"""
+
+    def __init__(self, connect, reconcile_interval=300, chunk_size=50000, verify_interval=None):
+        self.connect = connect
+        self.reconcile_interval = reconcile_interval
+        self.chunk_size = chunk_size
+        # When set, pushed changes keep the frame current and the table is only checked this often
+        self.verify_interval = verify_interval
+        self.frame = None
+        self.max_id = None
+        self.max_updated_at = None
+        self.last_reconciled = 0
+        self.last_verified = 0
+        # Row count last reported by data_version, used to spot deletes early
+        self.expected_rows = None
+        # Objects with on_change(removed, added, reset) that follow every change to the frame
+        self.listeners = []
+        self.lock = threading.RLock()
+
+    def read(self, query, params=None):
+        """Run a query on a pooled connection and return a DataFrame"""
+        try:
+            with self.connect() as connection:
+                return pd.read_sql(query, connection, params=params)
         except Exception as e:
-            print(f"Database connection error: {e}")
+            print(f"Database query error: {e}")
+            metrics.inc('errors_total', source='database')
+            return None
+
+    def read_chunks(self, query, params=None):
+        """Stream a query in compacted chunks so the raw result set is never held at once"""
+        with self.connect() as connection:
+            for chunk in pd.read_sql(query, connection, params=params, chunksize=self.chunk_size):
+                yield compact_frame(chunk)
+
+    def read_compact(self, query, params=None):
+        """Chunked read of a whole result set into one compact frame"""
+        try:
+            frame = concat_frames(list(self.read_chunks(query, params)))
+        except Exception as e:
+            print(f"Database query error: {e}")
+            metrics.inc('errors_total', source='database')
+            return None
+        if frame is None:
+            # No rows: an empty frame still needs its columns
+            frame = self.read(f"{query} LIMIT 0", params)
+        return frame
+
+    def notify(self, removed=None, added=None, reset=False):
+        for listener in self.listeners:
+            try:
+                listener.on_change(removed, added, reset)
+            except Exception as e:
+                # Rebuild from the full frame rather than leave the listener out of step
+                print(f"Frame store listener error: {e}")
+                metrics.inc('errors_total', source='listener')
+                listener.on_change(added=self.frame, reset=True)
+
+    def update_watermark(self):
+        """Remember the highest id and updated_at seen so far"""
+        if self.frame.empty:
+            self.max_id = None
+            self.max_updated_at = None
+            return
+        self.max_id = int(self.frame['id'].max())
+        updated_at = pd.to_datetime(self.frame['updated_at']).max()
+        self.max_updated_at = None if pd.isna(updated_at) else updated_at.to_pydatetime()
+
+    def full_load(self):
+        """Load the whole table once"""
+        df = self.read_compact(f"SELECT {WASTE_COLUMNS} FROM wastes")
+        if df is None:
+            return False
+        self.frame = df
+        self.update_watermark()
+        self.last_reconciled = time.time()
+        self.last_verified = self.last_reconciled
+        self.notify(added=df, reset=True)
+        return True
+
+    def apply_changes(self, upserted=(), deleted=()):
+        """Merge pushed row changes by primary key instead of scanning for them
+        
+        Returns True when the frame changed.
+        """
+        with self.lock:
+            if self.frame is None:
+                # The first full load will include these rows anyway
+                return False
+            deleted = set(deleted)
+            upserted = sorted(set(upserted) - deleted)
+            delta = None
+            if upserted:
+                placeholders = ', '.join(['%s'] * len(upserted))
+                delta = self.read_compact(f"SELECT {WASTE_COLUMNS} FROM wastes WHERE id IN ({placeholders})", tuple(upserted))
+                if delta is None:
+                    # Fall back to checking the whole table on next access
+                    self.invalidate()
+                    return False
+                # Pushed rows that are gone by now were deleted in the meantime
+                deleted |= set(upserted) - set(delta['id'].tolist())
+            replaced = self.frame['id'].isin(list(deleted) + upserted)
+            removed = self.frame[replaced]
+            if removed.empty and (delta is None or delta.empty):
+                return False
+            self.frame = concat_frames([self.frame[~replaced], delta]).reset_index(drop=True)
+            self.update_watermark()
+            self.notify(removed=removed, added=delta)
+            return True
+
+    def invalidate(self):
+        """Check the table on next access even if the change feed says nothing changed"""
+        self.last_verified = 0
+
+    def feed_current(self):
+        """True while pushed changes alone are trusted to keep the frame current"""
+        return (
+            self.verify_interval is not None and self.frame is not None
+            and time.time() - self.last_verified < self.verify_interval
+        )
+
+    def local_version(self):
+        """data_version of the frame held in memory, without a query"""
+        with self.lock:
+            return (
+                len(self.frame),
+                self.max_id,
+                None if self.max_updated_at is None else str(pd.Timestamp(self.max_updated_at))
+            )
+
+    def load_delta(self):
+        """Merge rows inserted or updated since the last watermark"""
+        if self.max_id is None:
+            return self.full_load()
+
+        if self.max_updated_at is not None:
+            # updated_at has one-second resolution, so rows saved in the watermark's
+            # own second are read again; unchanged ones are dropped below
+            query = f"SELECT {WASTE_COLUMNS} FROM wastes WHERE id > %s OR updated_at >= %s"
+            params = (self.max_id, self.max_updated_at)
+        else:
+            query = f"SELECT {WASTE_COLUMNS} FROM wastes WHERE id > %s"
+            params = (self.max_id,)
+
+        delta = self.read_compact(query, params)
+        if delta is None:
+            return False
+        if not delta.empty:
+            delta = self.changed_rows(delta.drop_duplicates(subset='id', keep='last'))
+        if not delta.empty:
+            # Updated rows replace the copy we already hold
+            replaced = self.frame[self.frame['id'].isin(delta['id'])]
+            merged = concat_frames([self.frame, delta])
+            self.frame = merged.drop_duplicates(subset='id', keep='last').reset_index(drop=True)
+            self.update_watermark()
+            self.notify(removed=replaced, added=delta)
+        return True
+
+    def changed_rows(self, delta):
+        """Rows of a delta that are new or differ from the copy already held"""
+        held = self.frame[self.frame['id'].isin(delta['id'])]
+        if held.empty:
+            return delta
+        fresh = delta.set_index('id')
+        held = held.set_index('id').reindex(fresh.index)
+        same = np.ones(len(fresh), dtype=bool)
+        for col in fresh.columns:
+            if pd.api.types.is_float_dtype(fresh[col]):
+                # Weights may have been held at a different float width
+                same &= np.isclose(fresh[col].to_numpy(dtype='float64'), held[col].to_numpy(dtype='float64'), equal_nan=True)
+            else:
+                # Categoricals of two frames have different categories, so compare plain values
+                a, b = fresh[col].astype(object), held[col].astype(object)
+                same &= ((a == b) | (a.isna() & b.isna())).to_numpy()
+        return delta[~same]
+
+    def reconcile(self):
+        """Drop rows that have been deleted from the table"""
+        ids = self.read("SELECT id FROM wastes")
+        if ids is None:
+            return False
+        present = self.frame['id'].isin(ids['id'])
+        deleted = self.frame[~present]
+        self.frame = self.frame[present].reset_index(drop=True)
+        self.update_watermark()
+        self.last_reconciled = time.time()
+        if not deleted.empty:
+            self.notify(removed=deleted)
+        return True
+
+    def refresh(self):
+        """Bring the store up to date with the database"""
+        if self.frame is None:
+            return self.full_load()
+        if self.feed_current():
+            return True
+        if not self.load_delta():
+            return False
+        rows_differ = self.expected_rows is not None and len(self.frame) != self.expected_rows
+        if rows_differ or time.time() - self.last_reconciled >= self.reconcile_interval:
+            if not self.reconcile():
+                return False
+        self.last_verified = time.time()
+        return True
+
+    def data_version(self):
+        """Cheap fingerprint of the table: row count plus highest id and updated_at"""
+        if self.feed_current():
+            return self.local_version()
+        df = self.read("SELECT COUNT(*) AS row_count, MAX(id) AS max_id, MAX(updated_at) AS max_updated_at FROM wastes")
+        if df is None or df.empty:
             return None
+        row = df.iloc[0]
+        self.expected_rows = int(row['row_count'])
+        version = (
+            int(row['row_count']),
+            None if pd.isna(row['max_id']) else int(row['max_id']),
+            None if pd.isna(row['max_updated_at']) else str(row['max_updated_at'])
+        )
+        if self.verify_interval is not None and self.frame is not None and version == self.local_version():
+            # The feed has not missed anything, so it can be trusted for another interval
+            self.last_verified = time.time()
+        return version
+
+    def snapshot(self):
+        """Return a fresh copy of the table, newest records first"""
+        with self.lock:
+            try:
+                ok = self.refresh()
+            except Exception as e:
+                print(f"Frame store refresh error: {e}")
+                metrics.inc('errors_total', source='refresh')
+                ok = False
+            if self.frame is None:
+                return None
+            if not ok:
+                print("Serving last known data")
+            return self.frame.sort_values('created_at', ascending=False).reset_index(drop=True)
+
+class ChangeJournal:
+    """Append-only file of pushed row changes that every worker process follows"""
+
+    def __init__(self, path, max_bytes=1_000_000):
+        self.path = path
+        self.max_bytes = max_bytes
+        # (inode, offset) read so far; changes from before start-up are already in the table
+        self.position = self.end()
+
+    def end(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def append(self, upserted, deleted):
+        line = json.dumps({'upserted': upserted, 'deleted': deleted}) + '\n'
+        with exclusive_file_lock(self.path):
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                # A fresh file has a new inode, which tells followers to re-check the table
+                open(self.path + '.tmp', 'w').close()
+                os.replace(self.path + '.tmp', self.path)
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+    def read_new(self):
+        """Entries appended since the last call, or None when some may have been missed"""
+        inode, offset = self.position
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return []
+        if inode is not None and (stat.st_ino != inode or stat.st_size < offset):
+            self.position = (stat.st_ino, stat.st_size)
+            return None
+        if stat.st_size == offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(stat.st_size - offset)
+        # A line still being written is picked up on the next call
+        complete = data[:data.rfind(b'\n') + 1]
+        self.position = (stat.st_ino, offset + len(complete))
+        return [json.loads(line) for line in complete.decode().splitlines() if line.strip()]
+
+class WasteMLAnalytics:
+    def __init__(self, pool=None):
+        self._scaler = None
+        self.categories = category_registry
+        self.models = {}
+        self.db = pool or db_pool
+        self.frame_store = WasteFrameStore(
+            self.connect_to_database, chunk_size=INGEST_CHUNK_SIZE,
+            verify_interval=CHANGE_FEED_VERIFY_INTERVAL if CHANGE_FEED else None
+        )
+        self.rollup = WasteRollup(self.rollup_rows)
+        self.frame_store.listeners.append(self.rollup)
+        # Latest preprocessed frame, the data version it was built from and the matching rollup
+        self.prepared = (None, None)
+        self.prepared_rollup = None
+        self.prepared_lock = threading.Lock()
+        # filter key -> (prepared frame, its filtered rows, their rollup), most recent last
+        self.slices = OrderedDict()
+        # Serializes first-time and background model fits
+        self.training_lock = threading.RLock()
+        self.clustering_lock = threading.Lock()
+        # Models load on first use or in warm_up, keeping construction (and import) cheap
+    
+    @property
+    def scaler(self):
+        """Shared scaler persisted by save_models, created on first use"""
+        if self._scaler is None:
+            self._scaler = sk_preprocessing.StandardScaler()
+        return self._scaler
+    
+    def connect_to_database(self):
+        """Borrow a connection to your Laravel MySQL database from the pool"""
+        return self.db.connection()
     
     def fetch_real_time_data(self):
         """Fetch real-time data from your Laravel database"""
-        connection = self.connect_to_database()
-        if not connection:
-            return None
-        
         try:
-            query = """
-            SELECT id, type_of_waste AS TypeOfWaste, disposition AS Disposition, 
-               weight AS Weight, unit AS Unit, input_by AS InputBy, 
-               verified_by AS VerifiedBy, created_at, updated_at 
-        FROM wastes 
-        ORDER BY created_at DESC
-            """
-            df = pd.read_sql(query, connection)
-            connection.close()
+            with metrics.stage('fetch') as stage:
+                df = self.frame_store.snapshot()
+                stage['rows'] = 0 if df is None else len(df)
             return df
         except Exception as e:
             print(f"Data fetch error: {e}")
+            metrics.inc('errors_total', source='fetch')
             return None
     
+    def prepared_data(self):
+        """Data version and preprocessed frame, rebuilt only when the table changes"""
+        version = self.frame_store.data_version()
+        with self.prepared_lock:
+            if version is not None and self.prepared[0] == version:
+                return self.prepared
+            # Holding the store lock keeps the frame and rollup from the same refresh
+            with self.frame_store.lock:
+                raw = self.fetch_real_time_data()
+                rollup = self.rollup.snapshot()
+            with metrics.stage('preprocess') as stage:
+                df = self.preprocess_data(raw)
+                stage['rows'] = 0 if df is None else len(df)
+            if df is not None:
+                self.prepared = (version, df)
+                self.prepared_rollup = rollup
+            return version, df
+    
+    def rollup_rows(self, rows):
+        """Rollup keys and weight in kg for raw store rows"""
+        return pd.DataFrame({
+            'date': pd.to_datetime(rows['created_at']).dt.normalize(),
+            'TypeOfWaste': rows['TypeOfWaste'],
+            'Disposition': rows['Disposition'],
+            'InputBy': rows['InputBy'],
+            'weight_kg': self.weights_to_kg(rows['Weight'], rows['Unit'])
+        }, index=rows.index)
+    
+    def rollup_for(self, df):
+        """Maintained rollup for the prepared frame, or one built from the rows of any other frame"""
+        if df is self.prepared[1] and self.prepared_rollup is not None:
+            return self.prepared_rollup
+        for _, rows, rollup in list(self.slices.values()):
+            if df is rows and rollup is not None:
+                return rollup
+        return rollup_frame(df)
+    
+    def filtered_data(self, filters=None):
+        """Data version and the prepared rows matching filters, sliced from the in-memory frame"""
+        version, df = self.prepared_data()
+        if df is None or not filters:
+            return version, df
+        key = tuple(sorted(filter_params(filters).items()))
+        with self.prepared_lock:
+            cached = self.slices.get(key)
+            if cached is not None and cached[0] is df:
+                self.slices.move_to_end(key)
+                return version, cached[1]
+            rollup = self.prepared_rollup
+        
+        rows = df[filter_mask(df, filters)].reset_index(drop=True)
+        # The rollup shares the date and filter columns, so it slices the same way
+        rollup = None if rollup is None else rollup[filter_mask(rollup, filters)].reset_index(drop=True)
+        with self.prepared_lock:
+            self.slices[key] = (df, rows, rollup)
+            while len(self.slices) > FILTERED_SLICES:
+                self.slices.popitem(last=False)
+        return version, rows
+    
+    def training_frame(self, df, filters=None):
+        """Frame shared models train on: the full prepared frame when df is a filtered slice
+        
+        Callers pass the filters df was sliced by rather than having the slice
+        recognised later, which would fail once it left the slice cache.
+        """
+        if filters:
+            return self.prepared[1]
+        return df
+    
     def convert_to_kg(self, weight, unit):
         """Convert weights to standard kg unit"""
         weight = float(weight) if weight else 0
         unit = str(unit).lower() if unit else 'kg'
-        
-        conversion_factors = {
-            'lbs': 0.453592, 'lb': 0.453592,
-            'tons': 1000, 'ton': 1000,
-            'g': 0.001, 'grams': 0.001,
-            'kg': 1, 'kilograms': 1
+        return weight * UNIT_FACTORS.get(unit, 1)
+    
+    def weights_to_kg(self, weights, units):
+        """Vectorized convert_to_kg over whole columns"""
+        weights = pd.to_numeric(weights, errors='coerce').fillna(0).to_numpy(dtype='float64')
+        
+        # Look factors up once per distinct unit string, then broadcast through the codes
+        # Missing units get code -1, which picks the trailing kg factor
+        units = pd.Categorical(units)
+        factors = np.array([UNIT_FACTORS.get(str(u).lower(), 1) for u in units.categories] + [1.0])
+        return weights * factors[units.codes]
+    
+    def add_date_features(self, df):
+        """Derive all calendar features from created_at in one pass"""
+        created = pd.to_datetime(df['created_at'])
+        df['created_at'] = created
+        
+        stamps = created.to_numpy(dtype='datetime64[ns]')
+        days = stamps.astype('datetime64[D]')
+        day_numbers = days.astype('int64')
+        months = stamps.astype('datetime64[M]').astype('int64') % 12 + 1
+        
+        features = {
+            'hour': (stamps - days) // np.timedelta64(1, 'h'),
+            # 1970-01-01 was a Thursday (dayofweek 3)
+            'day_of_week': (day_numbers + 3) % 7,
+            'month': months,
+            'quarter': (months - 1) // 3 + 1,
         }
-        return weight * conversion_factors.get(unit, 1)
+        
+        # Rows created before timestamps were added have no created_at
+        missing = np.isnat(stamps)
+        if missing.any():
+            features = {name: np.where(missing, np.nan, values) for name, values in features.items()}
+        
+        # Midnight timestamps keep date arithmetic vectorized, unlike python date objects
+        df['date'] = days.astype('datetime64[ns]')
+        for name, values in features.items():
+            df[name] = values
+        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+        return df
     
     def preprocess_data(self, df):
         """Preprocess data for ML models"""
@@ -78,163 +1427,420 @@ class WasteMLAnalytics:
             return None
         
         # Convert weights to kg
-        df['weight_kg'] = df.apply(lambda row: self.convert_to_kg(row['Weight'], row['Unit']), axis=1)
+        df['weight_kg'] = self.weights_to_kg(df['Weight'], df['Unit'])
         
         # Extract date features
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        df['date'] = df['created_at'].dt.date
-        df['hour'] = df['created_at'].dt.hour
-        df['day_of_week'] = df['created_at'].dt.dayofweek
-        df['month'] = df['created_at'].dt.month
-        df['quarter'] = df['created_at'].dt.quarter
-        df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
-        
-        # Encode categorical variables
-        categorical_columns = ['TypeOfWaste', 'Disposition', 'InputBy']
-        for col in categorical_columns:
-            if col not in self.label_encoders:
-                self.label_encoders[col] = LabelEncoder()
-                df[f'{col}_encoded'] = self.label_encoders[col].fit_transform(df[col].fillna('Unknown'))
-            else:
-                # Handle new categories
-                try:
-                    df[f'{col}_encoded'] = self.label_encoders[col].transform(df[col].fillna('Unknown'))
-                except ValueError:
-                    # Add new categories to encoder
-                    unique_values = list(self.label_encoders[col].classes_) + list(df[col].unique())
-                    self.label_encoders[col].classes_ = np.array(list(set(unique_values)))
-                    df[f'{col}_encoded'] = self.label_encoders[col].transform(df[col].fillna('Unknown'))
+        df = self.add_date_features(df)
+        
+        # Encode categorical variables with codes that never change once assigned
+        for col in ENCODED_COLUMNS:
+            df[f'{col}_encoded'] = self.categories.encode(col, df[col])
         
         return df
     
-    def time_series_prediction(self, df, days_ahead=7):
-        """Predict waste generation for next N days"""
+    def daily_features(self, df, start_date=None, end=None):
+        """Aggregate records per day and build the forecasting features"""
+        # Create daily aggregations
+        daily_data = rollup_totals(self.rollup_for(df), ['date'])
+        daily_data.columns = ['date', 'total_weight', 'item_count']
+        if end is not None:
+            daily_data = continuous_days(daily_data, end)
+        return series_features(daily_data, start_date)
+    
+    def data_watermark(self, df):
+        """Describe which rows a model was trained on"""
+        updated_at = pd.to_datetime(df['updated_at']).max() if 'updated_at' in df.columns else None
+        return {
+            'max_id': int(df['id'].max()),
+            'max_updated_at': None if updated_at is None or pd.isna(updated_at) else updated_at.isoformat(),
+            'rows': int(len(df))
+        }
+    
+    def train_forecaster(self, df):
+        """Fit the weight and count forecasters on the full history"""
         if df is None or df.empty:
-            return []
+            return None
         
-        # Create daily aggregations
-        daily_data = df.groupby('date').agg({
-            'weight_kg': 'sum',
-            'id': 'count'
-        }).reset_index()
+        daily_data = rollup_totals(self.rollup_for(df), ['date'])
         daily_data.columns = ['date', 'total_weight', 'item_count']
-        daily_data = daily_data.sort_values('date')
+        forecaster = fit_forecaster(daily_data, n_jobs=ML_N_JOBS)
+        if forecaster is not None:
+            forecaster['watermark'] = self.data_watermark(df)
+        return forecaster
+    
+    def get_forecaster(self, df, filters=None):
+        """Current registered forecaster, training the first version if none exists"""
+        forecaster = model_registry.load_current('forecaster')
+        if forecaster is None or forecaster.get('feature_schema') != FORECAST_SCHEMA:
+            with self.training_lock, model_registry.fit_lock('forecaster'):
+                forecaster = model_registry.load_current('forecaster')
+                # Bundles built with older feature definitions cannot be fed the current features
+                if forecaster is None or forecaster.get('feature_schema') != FORECAST_SCHEMA:
+                    forecaster = self.train_forecaster(self.training_frame(df, filters))
+                    if forecaster is None:
+                        return None
+                    model_registry.save('forecaster', forecaster)
+        self.models['predictor'] = forecaster
+        return forecaster
+    
+    def forecast_series(self, forecaster, daily_series, days_ahead):
+        """Recursive forecasts for several daily series at once with one model pair
+        
+        Every series is advanced a day at a time through its own ring buffer, and
+        each day is a single batched predict over all series. Returns the forecast
+        dates plus (series x days) weight and count arrays.
+        """
+        state = ForecastState([d['total_weight'].to_numpy() for d in daily_series],
+                              [d['item_count'].to_numpy() for d in daily_series])
+        last_date = max(d['date'].max() for d in daily_series)
+        dates = pd.date_range(last_date + timedelta(days=1), periods=days_ahead, freq='D')
+        
+        # Calendar features for the whole horizon in one go
+        calendar = {
+            'day_of_week': dates.dayofweek.to_numpy(),
+            'month': dates.month.to_numpy(),
+            'days_since_start': (dates - forecaster['start_date']).days.to_numpy()
+        }
         
-        if len(daily_data) < 14:  # Need minimum data
-            return []
+        feature_cols = forecaster['feature_cols']
+        weights = np.empty((state.size, days_ahead))
+        counts = np.empty((state.size, days_ahead), dtype='int64')
+        X = np.empty((state.size, len(feature_cols)))
         
-        # Create features for time series
-        daily_data['day_of_week'] = pd.to_datetime(daily_data['date']).dt.dayofweek
-        daily_data['month'] = pd.to_datetime(daily_data['date']).dt.month
-        daily_data['days_since_start'] = (daily_data['date'] - daily_data['date'].min()).dt.days
+        for step in range(days_ahead):
+            features = state.features()
+            for j, col in enumerate(feature_cols):
+                X[:, j] = calendar[col][step] if col in calendar else features[col]
+            
+            pred_weight = np.maximum(0, forest_predict(forecaster['weight_model'], X))
+            pred_count = np.maximum(0, forest_predict(forecaster['count_model'], X)).astype('int64')
+            
+            weights[:, step] = pred_weight
+            counts[:, step] = pred_count
+            state.push(pred_weight, pred_count)
         
-        # Create lagged features
-        for lag in [1, 3, 7]:
-            daily_data[f'weight_lag_{lag}'] = daily_data['total_weight'].shift(lag)
-            daily_data[f'count_lag_{lag}'] = daily_data['item_count'].shift(lag)
+        return dates, weights, counts
+    
+    def prediction_records(self, dates, weights, counts):
+        """Forecast arrays for one series as the API's list of dicts"""
+        return [
+            {'date': day, 'predicted_weight': round(float(w), 2), 'predicted_count': int(c)}
+            for day, w, c in zip(dates.strftime('%Y-%m-%d'), weights, counts)
+        ]
+    
+    def time_series_prediction(self, df, days_ahead=7, filters=None):
+        """Predict waste generation for next N days
         
-        # Moving averages
-        daily_data['weight_ma_3'] = daily_data['total_weight'].rolling(3).mean()
-        daily_data['weight_ma_7'] = daily_data['total_weight'].rolling(7).mean()
+        The registered forecaster models totals over every type, so a slice
+        filtered by type, disposition or user is forecast from series models
+        instead (see breakdown_prediction); date filters keep the totals model.
+        """
+        if df is None or df.empty:
+            return []
+        if any(col in (filters or {}) for col in FILTER_COLUMNS.values()):
+            forecast = self.breakdown_prediction(df, [], days_ahead, filters).get('')
+            return [] if forecast is None else forecast['predictions']
         
-        # Remove rows with NaN values
-        daily_data = daily_data.dropna()
+        forecaster = self.get_forecaster(df, filters)
+        if forecaster is None:
+            return []
         
+        # Lags come from the latest data even if the model is older
+        end = self.forecast_origin(filters) if filters else None
+        daily_data = self.daily_features(df, forecaster['start_date'], end)
         if len(daily_data) < 7:
             return []
         
-        # Prepare features and target
-        feature_cols = ['day_of_week', 'month', 'days_since_start', 
-                       'weight_lag_1', 'weight_lag_3', 'weight_lag_7',
-                       'count_lag_1', 'count_lag_3', 'count_lag_7',
-                       'weight_ma_3', 'weight_ma_7']
-        
-        X = daily_data[feature_cols]
-        y_weight = daily_data['total_weight']
-        y_count = daily_data['item_count']
-        
-        # Train models
-        rf_weight = RandomForestRegressor(n_estimators=100, random_state=42)
-        rf_count = RandomForestRegressor(n_estimators=100, random_state=42)
-        
-        rf_weight.fit(X, y_weight)
-        rf_count.fit(X, y_count)
-        
-        # Make predictions
-        predictions = []
-        last_date = daily_data['date'].max()
+        dates, weights, counts = self.forecast_series(forecaster, [daily_data], days_ahead)
+        return self.prediction_records(dates, weights[0], counts[0])
+    
+    def forecast_origin(self, filters):
+        """Last day the series of a slice run to: the full frame's last day, or an earlier 'to' date
+        
+        A slice ends on its own last record, which for a type not logged lately
+        lies in the past; forecasting from there would predict days already gone.
+        """
+        full = self.prepared[1]
+        end = None if full is None or full.empty else full['date'].max()
+        if 'to' in filters:
+            end = filters['to'] if end is None else min(end, filters['to'])
+        return end
+    
+    def series_by_key(self, df, by, end=None):
+        """(key tuple, daily series) for every combination of the breakdown columns
+        
+        With no columns the whole frame is one series, keyed (). Every series
+        runs day by day, zero-filled, up to end (by default the frame's last
+        day), so all of them are forecast from the same date.
+        """
+        if not by:
+            daily = rollup_totals(self.rollup_for(df), ['date'])
+            daily.columns = ['date', 'total_weight', 'item_count']
+            return {(): continuous_days(daily, end)}
+        totals = rollup_totals(self.rollup_for(df), ['date'] + by)
+        if end is None:
+            end = totals['date'].max()
+        series = {}
+        for key, group in totals.groupby(by):
+            key = key if isinstance(key, tuple) else (key,)
+            daily = group[['date', 'weight_kg', 'count']].rename(
+                columns={'weight_kg': 'total_weight', 'count': 'item_count'}
+            )
+            series[key] = continuous_days(daily, end)
+        return series
+    
+    def breakdown_series(self, df, by):
+        """Daily series for every combination of the breakdown columns"""
+        return {' / '.join(str(k) for k in key): daily for key, daily in self.series_by_key(df, by).items()}
+    
+    def train_series_forecasters(self, df, by, previous=None):
+        """Fit one forecaster per breakdown series in parallel, reusing unchanged ones"""
+        previous = (previous or {}).get('series', {})
+        series = self.breakdown_series(df, by)
+        
+        forecasters = {}
+        changed = {}
+        for key, daily in series.items():
+            fingerprint = series_fingerprint(daily)
+            old = previous.get(key)
+            if old is not None and old['fingerprint'] == fingerprint:
+                forecasters[key] = old
+            else:
+                changed[key] = (fingerprint, daily)
         
-        for i in range(1, days_ahead + 1):
-            pred_date = last_date + timedelta(days=i)
-            
-            # Create features for prediction
-            pred_features = {
-                'day_of_week': pred_date.weekday(),
-                'month': pred_date.month,
-                'days_since_start': (pred_date - daily_data['date'].min()).days,
-                'weight_lag_1': daily_data['total_weight'].iloc[-1] if i == 1 else predictions[-1]['predicted_weight'],
-                'weight_lag_3': daily_data['total_weight'].iloc[-3] if i <= 3 else predictions[-3]['predicted_weight'],
-                'weight_lag_7': daily_data['total_weight'].iloc[-7] if i <= 7 else predictions[-7]['predicted_weight'],
-                'count_lag_1': daily_data['item_count'].iloc[-1] if i == 1 else predictions[-1]['predicted_count'],
-                'count_lag_3': daily_data['item_count'].iloc[-3] if i <= 3 else predictions[-3]['predicted_count'],
-                'count_lag_7': daily_data['item_count'].iloc[-7] if i <= 7 else predictions[-7]['predicted_count'],
-                'weight_ma_3': daily_data['weight_ma_3'].iloc[-1],
-                'weight_ma_7': daily_data['weight_ma_7'].iloc[-1]
-            }
-            
-            X_pred = np.array([[pred_features[col] for col in feature_cols]])
-            
-            pred_weight = max(0, rf_weight.predict(X_pred)[0])
-            pred_count = max(0, int(rf_count.predict(X_pred)[0]))
-            
-            predictions.append({
-                'date': pred_date.strftime('%Y-%m-%d'),
-                'predicted_weight': round(pred_weight, 2),
-                'predicted_count': pred_count
-            })
+        # One process per series, each fitting single-threaded forests
+        fitted = joblib.Parallel(n_jobs=ML_N_JOBS)(
+            joblib.delayed(fit_series_forecaster)(daily) for _, daily in changed.values()
+        )
+        for (key, (fingerprint, _)), forecaster in zip(changed.items(), fitted):
+            forecasters[key] = {'fingerprint': fingerprint, 'forecaster': forecaster}
         
-        return predictions
+        return {
+            'by': by,
+            'series': forecasters,
+            'refitted': len(changed),
+            'reused': len(series) - len(changed),
+            'trained_at': datetime.now().isoformat(),
+            'watermark': self.data_watermark(df)
+        }
+    
+    def retrain_series_forecasters(self, df, by):
+        """Register a new version of the breakdown forecasters"""
+        name = 'forecaster_by_' + '_'.join(by)
+        with self.training_lock:
+            previous = model_registry.load_current(name)
+            if previous is not None and previous.get('feature_schema') != FORECAST_SCHEMA:
+                previous = None
+            bundle = self.train_series_forecasters(df, by, previous)
+            bundle['feature_schema'] = FORECAST_SCHEMA
+            model_registry.save(name, bundle)
+            return bundle
     
-    def anomaly_detection(self, df):
-        """Detect anomalies in waste data"""
+    def get_series_forecasters(self, df, by, filters=None):
+        name = 'forecaster_by_' + '_'.join(by)
+        bundle = model_registry.load_current(name)
+        if bundle is None or bundle.get('feature_schema') != FORECAST_SCHEMA:
+            bundle = self.retrain_series_forecasters(self.training_frame(df, filters), by)
+        return bundle
+    
+    def series_model_columns(self, by, filters):
+        """Breakdown columns of the series models that forecast `by` on a slice filtered by filters"""
+        return [col for col in BREAKDOWN_COLUMNS.values() if col in by or col in filters]
+    
+    def forecast_models(self, by=(), filters=None):
+        """Registered models a forecast of `by` on a slice filtered by filters is computed with"""
+        filters = filters or {}
+        model_by = self.series_model_columns(by, filters)
+        if not model_by:
+            return ['forecaster']
+        # A slice by user fits its own models
+        return [] if 'InputBy' in filters else ['forecaster_by_' + '_'.join(model_by)]
+    
+    def breakdown_prediction(self, df, by, days_ahead=7, filters=None):
+        """Forecasts per waste type and/or disposition from their own models
+        
+        Forecasts never come from a model fitted on a wider population than
+        the series it predicts. On a slice filtered by type or disposition,
+        the registered series models for those columns forecast each matching
+        series and the results are summed up to `by`. No model is registered
+        per user, so a slice filtered by user fits its own series models; the
+        caller caches the result per filter and data version.
+        """
         if df is None or df.empty:
-            return []
-        
-        # Features for anomaly detection
-        features = ['weight_kg', 'hour', 'day_of_week', 'month']
-        
-        # Add encoded categorical features
+            return {}
+        filters = filters or {}
+        model_by = self.series_model_columns(by, filters)
+        series = self.series_by_key(df, model_by, self.forecast_origin(filters) if filters else None)
+        bundle = None
+        if model_by and 'InputBy' not in filters:
+            bundle = self.get_series_forecasters(df, model_by, filters)
+        
+        groups = {}
+        for key, daily in series.items():
+            entry = None if bundle is None else bundle['series'].get(' / '.join(str(k) for k in key))
+            if entry is None:
+                # Slices by user, and series that appeared after the last retrain
+                forecaster = fit_series_forecaster(daily)
+            else:
+                forecaster = entry['forecaster']
+            daily = series_features(daily, forecaster['start_date'])
+            dates, weights, counts = self.forecast_series(forecaster, [daily], days_ahead)
+            values = dict(zip(model_by, key))
+            label = ' / '.join(str(values[col]) for col in by)
+            groups.setdefault(label, []).append((forecaster['model_type'], dates, weights[0], counts[0]))
+        
+        results = {}
+        for label, parts in groups.items():
+            # Series of one group can end on different days, so sum by date
+            weight = pd.concat([pd.Series(w, index=d) for _, d, w, _ in parts], axis=1).fillna(0).sum(axis=1)
+            count = pd.concat([pd.Series(c, index=d) for _, d, _, c in parts], axis=1).fillna(0).sum(axis=1)
+            weight = weight.iloc[-days_ahead:]
+            count = count.iloc[-days_ahead:]
+            results[label] = {
+                'model': ', '.join(sorted({model_type for model_type, _, _, _ in parts})),
+                'predictions': self.prediction_records(weight.index, weight.to_numpy(), count.to_numpy())
+            }
+        return results
+    
+    def anomaly_features(self, df, append=True):
+        """Detector feature matrix using the shared category codes"""
+        X = df[['weight_kg', 'hour', 'day_of_week', 'month']].astype(float)
         for col in ['TypeOfWaste', 'Disposition']:
-            if f'{col}_encoded' in df.columns:
-                features.append(f'{col}_encoded')
+            X[f'{col}_encoded'] = self.categories.encode(col, df[col], append=append)
+        return X.fillna(0)
+    
+    def train_detector(self, df):
+        """Fit the IsolationForest together with its feature order"""
+        if df is None or df.empty:
+            return None
         
-        X = df[features].fillna(0)
+        X = self.anomaly_features(df)
         
         # Isolation Forest for anomaly detection
-        iso_forest = IsolationForest(contamination=0.1, random_state=42)
-        anomalies = iso_forest.fit_predict(X)
+        iso_forest = sk_ensemble.IsolationForest(contamination=0.1, random_state=42, n_jobs=ML_N_JOBS)
+        iso_forest.fit(X)
         
-        # Get anomalous records
-        anomaly_data = df[anomalies == -1].copy()
-        anomaly_data['anomaly_score'] = iso_forest.decision_function(X)[anomalies == -1]
+        return {
+            'detector_model': iso_forest,
+            'feature_cols': list(X.columns),
+            'trained_at': datetime.now().isoformat(),
+            'watermark': self.data_watermark(df)
+        }
+    
+    def get_detector(self, df=None, filters=None):
+        """Current registered detector, fitting the first version if none exists"""
+        detector = model_registry.load_current('anomaly_detector')
+        if detector is None and df is not None:
+            with self.training_lock, model_registry.fit_lock('anomaly_detector'):
+                # Another thread or worker may have fitted the first version while we waited
+                detector = model_registry.load_current('anomaly_detector')
+                if detector is None:
+                    detector = self.train_detector(self.training_frame(df, filters))
+                    if detector is not None:
+                        model_registry.save('anomaly_detector', detector)
+        return detector
+    
+    def refresh_detector(self, max_age=3600):
+        """Refit the detector on the latest data once the current one is older than max_age seconds
+        
+        Every worker runs this on its own schedule; the age is checked under the
+        fit lock, so the first worker refits and the others find its version fresh.
+        """
+        with self.training_lock, model_registry.fit_lock('anomaly_detector'):
+            detector = model_registry.load_current('anomaly_detector')
+            if detector is not None:
+                age = (datetime.now() - datetime.fromisoformat(detector['trained_at'])).total_seconds()
+                if age < max_age:
+                    return detector['version']
+            
+            _, df = self.prepared_data()
+            detector = self.train_detector(df)
+            if detector is None:
+                return None
+            version = model_registry.save('anomaly_detector', detector)
+        result_cache.clear()
+        return version
+    
+    def score_anomalies(self, df, detector):
+        """Anomaly scores for preprocessed rows; negative scores are anomalies"""
+        # Scoring only reads codes; labels it has never seen score as Unknown
+        X = self.anomaly_features(df, append=False)[detector['feature_cols']]
+        return detector['detector_model'].decision_function(X)
+    
+    def score_records(self, records):
+        """Score raw waste records (dicts with TypeOfWaste, Weight, Unit, ...) against the current detector
         
-        # Sort by most anomalous
-        anomaly_data = anomaly_data.sort_values('anomaly_score')
+        Raises ValueError for records score_frame rejects.
+        """
+        df = score_frame(records)
+        detector = self.get_detector()
+        if detector is None:
+            return None, []
+        
+        df['weight_kg'] = self.weights_to_kg(df['Weight'], df['Unit'])
+        df = self.add_date_features(df)
+        scores = self.score_anomalies(df, detector)
         
         results = []
-        for _, row in anomaly_data.head(20).iterrows():
+        for i, score in enumerate(scores):
+            row = {'weight_kg': df['weight_kg'].iat[i], 'hour': df['hour'].iat[i]}
             results.append({
-                'id': int(row['id']),
-                'date': row['created_at'].strftime('%Y-%m-%d %H:%M'),
-                'waste_type': row['TypeOfWaste'],
-                'weight_kg': round(row['weight_kg'], 2),
-                'disposition': row['Disposition'],
-                'user': row['InputBy'],
-                'anomaly_score': round(row['anomaly_score'], 3),
-                'reason': self.get_anomaly_reason(row)
+                'id': None if pd.isna(df['id'].iat[i]) else int(df['id'].iat[i]),
+                'anomaly_score': round(float(score), 3),
+                'is_anomaly': bool(score < 0),
+                'reason': self.get_anomaly_reason(row) if score < 0 else None
             })
+        return detector['version'], results
+    
+    def anomaly_frame(self, df, filters=None):
+        """Every anomalous row in response form, most anomalous first
         
-        return results
+        Built column by column so the full list stays cheap to produce and
+        to page through, however many rows are flagged.
+        """
+        empty = pd.DataFrame(columns=ANOMALY_FIELDS)
+        if df is None or df.empty:
+            return empty
+        
+        # Scored with the registered detector; refits happen in the background
+        detector = self.get_detector(df, filters)
+        if detector is None:
+            return empty
+        scores = self.score_anomalies(df, detector)
+        anomalies = scores < 0
+        
+        # Sort by most anomalous
+        order = np.argsort(scores[anomalies], kind='stable')
+        rows = df[anomalies].iloc[order]
+        weight_kg = rows['weight_kg'].to_numpy()
+        
+        def labels(col):
+            values = rows[col].astype(object)
+            return values.where(values.notna(), None).to_numpy()
+        
+        return pd.DataFrame({
+            'id': rows['id'].astype('int64').to_numpy(),
+            'date': rows['created_at'].dt.strftime('%Y-%m-%d %H:%M').to_numpy(),
+            'waste_type': labels('TypeOfWaste'),
+            'weight_kg': weight_kg.round(2),
+            'disposition': labels('Disposition'),
+            'user': labels('InputBy'),
+            'anomaly_score': scores[anomalies][order].round(3),
+            'reason': self.anomaly_reasons(weight_kg, rows['hour'].to_numpy())
+        }, columns=ANOMALY_FIELDS)
+    
+    def anomaly_detection(self, df, filters=None):
+        """Detect anomalies in waste data: the 20 most anomalous records"""
+        return frame_records(self.anomaly_frame(df, filters).head(20))
+    
+    def anomaly_reasons(self, weight_kg, hour):
+        """get_anomaly_reason for whole columns at once"""
+        weight = np.select([weight_kg > 100, weight_kg < 0.1],
+                           ['Unusually high weight', 'Unusually low weight'], '').astype(object)
+        timing = np.where((hour < 6) | (hour > 22), 'Unusual processing time', '').astype(object)
+        both = (weight != '') & (timing != '')
+        reasons = weight + np.where(both, '; ', '').astype(object) + timing
+        return np.where(reasons == '', 'Statistical outlier', reasons)
     
     def get_anomaly_reason(self, row):
         """Determine reason for anomaly"""
@@ -252,38 +1858,38 @@ class WasteMLAnalytics:
         
         return "; ".join(reasons) if reasons else "Statistical outlier"
     
-    def waste_clustering(self, df):
+    def waste_clustering(self, df, filters=None):
         """Cluster waste patterns"""
         if df is None or df.empty:
             return {}
         
         # Features for clustering
-        daily_stats = df.groupby(['date', 'TypeOfWaste']).agg({
-            'weight_kg': 'sum',
-            'id': 'count'
-        }).reset_index()
+        daily_stats = rollup_totals(self.rollup_for(df), ['date', 'TypeOfWaste'])
         
         # Pivot to get waste types as features
         pivot_data = daily_stats.pivot_table(
             index='date', 
             columns='TypeOfWaste', 
             values='weight_kg', 
-            fill_value=0
+            fill_value=0,
+            observed=True
         )
         
         if pivot_data.empty:
             return {}
         
-        # Standardize data
-        X_scaled = self.scaler.fit_transform(pivot_data)
-        
-        # K-means clustering
-        kmeans = KMeans(n_clusters=min(5, len(pivot_data)), random_state=42)
-        clusters = kmeans.fit_predict(X_scaled)
+        # Cluster labels per day, without touching the shared self.scaler
+        with self.clustering_lock:
+            if filters:
+                clusters = self.slice_clusters(pivot_data)
+            elif CLUSTERING_MODE == 'incremental':
+                clusters = self.incremental_clusters(pivot_data)
+            else:
+                clusters = self.full_clusters(pivot_data)
         
-        # Analyze clusters
+        # Analyze clusters; a slice may not contain days from every cluster
         cluster_analysis = {}
-        for i in range(max(clusters) + 1):
+        for i in np.unique(clusters):
             cluster_dates = pivot_data.index[clusters == i]
             cluster_data = pivot_data.iloc[clusters == i]
             
@@ -296,6 +1902,88 @@ class WasteMLAnalytics:
         
         return cluster_analysis
     
+    def fit_clusterer(self, pivot_data, previous=None, incremental=True):
+        """Fit a private scaler and clusterer on every day, warm-started from previous centroids"""
+        n_clusters = min(5, len(pivot_data))
+        scaler = sk_preprocessing.StandardScaler()
+        X_scaled = scaler.fit_transform(pivot_data)
+        
+        init, n_init = 'k-means++', 'auto'
+        if previous is not None and previous['waste_types'] == list(pivot_data.columns):
+            centroids = previous['cluster_model'].cluster_centers_
+            if centroids.shape[0] == n_clusters:
+                init, n_init = centroids, 1
+        
+        if incremental:
+            model = sk_cluster.MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=n_init, random_state=42)
+        else:
+            model = sk_cluster.KMeans(n_clusters=n_clusters, init=init, n_init=n_init, random_state=42)
+        labels = model.fit_predict(X_scaled)
+        
+        return {
+            'cluster_model': model,
+            'scaler_model': scaler,
+            'mode': 'incremental' if incremental else 'full',
+            'waste_types': list(pivot_data.columns),
+            'fitted_through': pivot_data.index.max(),
+            'assignments': pd.Series(labels, index=pivot_data.index),
+            'trained_at': datetime.now().isoformat()
+        }
+    
+    def full_clusters(self, pivot_data):
+        """Refit on every day each call, starting from the last centroids"""
+        state = self.fit_clusterer(pivot_data, model_registry.load_current('clusterer'), incremental=False)
+        model_registry.save('clusterer', state)
+        return state['assignments'].to_numpy()
+    
+    def incremental_clusters(self, pivot_data):
+        """partial_fit only the days added since the last call and reuse stored assignments"""
+        state = model_registry.load_current('clusterer')
+        # The latest day may still grow, so only earlier days are fitted and stored;
+        # assign_clusters predicts the latest one on every call
+        settled = pivot_data.iloc[:-1]
+        if settled.empty:
+            settled = pivot_data
+        
+        needs_refit = (
+            state is None
+            or state['mode'] != 'incremental'
+            or state['waste_types'] != list(pivot_data.columns)
+            or state['cluster_model'].n_clusters != min(5, len(settled))
+        )
+        if needs_refit:
+            state = self.fit_clusterer(settled, state)
+            model_registry.save('clusterer', state)
+        else:
+            new_days = settled[settled.index > state['fitted_through']]
+            if len(new_days):
+                state['scaler_model'].partial_fit(new_days)
+                X_new = state['scaler_model'].transform(new_days)
+                state['cluster_model'].partial_fit(X_new)
+                labels = pd.Series(state['cluster_model'].predict(X_new), index=new_days.index)
+                state['assignments'] = pd.concat([state['assignments'], labels])
+                state['fitted_through'] = new_days.index.max()
+                model_registry.save('clusterer', state)
+        
+        return self.assign_clusters(state, pivot_data)
+    
+    def slice_clusters(self, pivot_data):
+        """Labels for a filtered slice from the shared clusterer, which is never refitted on it"""
+        state = model_registry.load_current('clusterer')
+        if state is None or state['waste_types'] != list(pivot_data.columns):
+            # e.g. a type filter leaves other columns than the shared model was fitted on
+            state = self.fit_clusterer(pivot_data)
+        return self.assign_clusters(state, pivot_data)
+    
+    def assign_clusters(self, state, pivot_data):
+        """Stored labels for known days, predicted ones for the rest"""
+        assignments = state['assignments'].reindex(pivot_data.index)
+        pending = assignments.isna()
+        if pending.any():
+            X_pending = state['scaler_model'].transform(pivot_data[pending])
+            assignments[pending] = state['cluster_model'].predict(X_pending)
+        return assignments.to_numpy(dtype='int64')
+    
     def describe_cluster_pattern(self, cluster_data):
         """Describe the pattern of a cluster"""
         avg_weights = cluster_data.mean()
@@ -311,25 +1999,20 @@ class WasteMLAnalytics:
         if df is None or df.empty:
             return {}
         
-        monthly_data = df.groupby('month').agg({
-            'weight_kg': 'sum',
-            'id': 'count'
-        }).reset_index()
+        # Calendar patterns only need per-day totals
+        daily = rollup_totals(self.rollup_for(df), ['date']).rename(columns={'count': 'id'})
+        daily['month'] = daily['date'].dt.month
+        daily['quarter'] = daily['date'].dt.quarter
+        daily['day_of_week'] = daily['date'].dt.dayofweek
         
-        quarterly_data = df.groupby('quarter').agg({
-            'weight_kg': 'sum',
-            'id': 'count'
-        }).reset_index()
-        
-        weekly_data = df.groupby('day_of_week').agg({
-            'weight_kg': 'sum',
-            'id': 'count'
-        }).reset_index()
+        monthly_data = daily.groupby('month')[['weight_kg', 'id']].sum().reset_index()
+        quarterly_data = daily.groupby('quarter')[['weight_kg', 'id']].sum().reset_index()
+        weekly_data = daily.groupby('day_of_week')[['weight_kg', 'id']].sum().reset_index()
         
         return {
-            'monthly_patterns': monthly_data.to_dict('records'),
-            'quarterly_patterns': quarterly_data.to_dict('records'),
-            'weekly_patterns': weekly_data.to_dict('records'),
+            'monthly_patterns': frame_records(monthly_data),
+            'quarterly_patterns': frame_records(quarterly_data),
+            'weekly_patterns': frame_records(weekly_data),
             'peak_month': int(monthly_data.loc[monthly_data['weight_kg'].idxmax(), 'month']),
             'peak_quarter': int(quarterly_data.loc[quarterly_data['weight_kg'].idxmax(), 'quarter']),
             'peak_day': int(weekly_data.loc[weekly_data['weight_kg'].idxmax(), 'day_of_week'])
@@ -344,7 +2027,7 @@ class WasteMLAnalytics:
         
         # Analyze recycling efficiency
         if 'Disposition' in df.columns:
-            disposition_stats = df.groupby('Disposition')['weight_kg'].sum()
+            disposition_stats = df.groupby('Disposition', observed=True)['weight_kg'].sum()
             total_weight = disposition_stats.sum()
             
             recycled_weight = disposition_stats.get('Recycled', 0) + disposition_stats.get('Composted', 0)
@@ -359,7 +2042,7 @@ class WasteMLAnalytics:
                 })
         
         # Analyze user efficiency
-        user_efficiency = df.groupby('InputBy').agg({
+        user_efficiency = df.groupby('InputBy', observed=True).agg({
             'weight_kg': 'mean',
             'id': 'count'
         }).reset_index()
@@ -393,68 +2076,794 @@ class WasteMLAnalytics:
             'total_processed': total_weight if 'total_weight' in locals() else 0
         }
     
+    def summary_aggregates(self, filters=None):
+        """Daily, hourly and per-type totals, from memory unless SUMMARY_SOURCE is 'database'
+        
+        Daily and per-type totals are read off the maintained rollup and only
+        the hourly ones group the prepared rows. Without data in memory the
+        table is streamed instead.
+        """
+        if SUMMARY_SOURCE == 'database':
+            return self.stream_aggregates(filters)
+        _, df = self.filtered_data(filters)
+        if df is None:
+            return self.stream_aggregates(filters)
+        
+        aggregates = WasteAggregates()
+        aggregates.rows = len(df)
+        if df.empty:
+            return aggregates
+        rollup = self.rollup_for(df)
+        for attr, key in [('daily', 'date'), ('by_type', 'TypeOfWaste')]:
+            totals = rollup_totals(rollup, [key]).set_index(key)
+            setattr(aggregates, attr, totals.set_axis(['sum', 'count'], axis=1))
+        aggregates.hourly = df.groupby('hour', observed=True)['weight_kg'].agg(['sum', 'count'])
+        return aggregates
+    
+    def stream_aggregates(self, filters=None):
+        """Daily, hourly and per-type totals over the table in bounded memory
+        
+        Filters go into the query, so only the matching rows leave the database.
+        """
+        aggregates = WasteAggregates()
+        where, params = filter_sql(filters or {})
+        for chunk in self.frame_store.read_chunks(f"SELECT {WASTE_COLUMNS} FROM wastes{where}", params or None):
+            chunk['weight_kg'] = self.weights_to_kg(chunk['Weight'], chunk['Unit'])
+            aggregates.fold(self.add_date_features(chunk))
+        return aggregates
+    
+    def live_summary(self):
+        """Headline totals from the maintained rollup, cheap enough to push on every change"""
+        rollup = self.rollup.snapshot()
+        if rollup is None:
+            return {}
+        today = rollup[rollup['date'] == pd.Timestamp.now().normalize()]
+        
+        def breakdown(col):
+            totals = rollup_totals(rollup, [col])
+            return [
+                {col: str(row[col]), 'weight_kg': round(float(row['weight_kg']), 2), 'count': int(row['count'])}
+                for row in totals.to_dict('records')
+            ]
+        
+        return {
+            'total_records': int(rollup['count'].sum()),
+            'total_weight_kg': round(float(rollup['weight_kg'].sum()), 2),
+            'today': {
+                'records': int(today['count'].sum()),
+                'weight_kg': round(float(today['weight_kg'].sum()), 2)
+            },
+            'by_type': breakdown('TypeOfWaste'),
+            'by_disposition': breakdown('Disposition')
+        }
+    
+    def run_analyses(self, df, filters=None):
+        """Run the independent analyses on one frame, returning results and wall times"""
+        stages = {
+            'predictions': lambda df: self.time_series_prediction(df, filters=filters),
+            'anomalies': lambda df: self.anomaly_detection(df, filters),
+            'clusters': lambda df: self.waste_clustering(df, filters),
+            'seasonal_analysis': self.seasonal_analysis,
+            'optimization': self.optimization_recommendations
+        }
+        timings = {}
+        
+        def timed(name):
+            start = time.perf_counter()
+            with metrics.stage(name) as stage:
+                result = stages[name](df)
+                stage['rows'] = len(df)
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+            return result
+        
+        if ANALYSIS_EXECUTION == 'parallel':
+            # sklearn and numpy release the GIL for the heavy parts, so threads overlap well;
+            # each task runs in a copy of the caller's context so a request profile sees its stages
+            futures = {
+                name: analysis_pool.submit(contextvars.copy_context().run, timed, name)
+                for name in stages
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        else:
+            results = {name: timed(name) for name in stages}
+        
+        return results, {name: timings[name] for name in stages}
+    
+    def full_analysis(self, filters=None):
+        """Run every analysis on the latest data, or None when there is no data"""
+        # Fetch and preprocess real-time data
+        version, df = self.filtered_data(filters)
+        
+        if df is None:
+            return None
+        
+        # Perform ML analysis
+        results, timings = self.run_analyses(df, filters)
+        
+        return {
+            **results,
+            'stage_timings_ms': timings,
+            'data_stats': {
+                'total_records': len(df),
+                'date_range': None if df.empty else {
+                    'start': df['created_at'].min().strftime('%Y-%m-%d'),
+                    'end': df['created_at'].max().strftime('%Y-%m-%d')
+                },
+                'total_weight_kg': round(float(df['weight_kg'].sum()), 2)
+            }
+        }
+    
     def load_models(self):
         """Load pre-trained models if they exist"""
         try:
-            self.models['scaler'] = joblib.load('models/scaler.joblib')
-            self.models['predictor'] = joblib.load('models/predictor.joblib')
-        except:
+            self.models['scaler'] = joblib.load(os.path.join(MODEL_DIR, 'scaler.joblib'))
+        except Exception:
+            pass
+        predictor = model_registry.load_current('forecaster')
+        if predictor is not None:
+            self.models['predictor'] = predictor
+        else:
             print("No pre-trained models found. Will train new models.")
     
     def save_models(self):
         """Save trained models"""
-        import os
-        os.makedirs('models', exist_ok=True)
-        joblib.dump(self.scaler, 'models/scaler.joblib')
-        if 'predictor' in self.models:
-            joblib.dump(self.models['predictor'], 'models/predictor.joblib')
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        joblib.dump(self.scaler, os.path.join(MODEL_DIR, 'scaler.joblib'))
+    
+    def retrain(self, df):
+        """Train a new forecaster version and make it current"""
+        forecaster = self.train_forecaster(df)
+        if forecaster is None:
+            return None
+        version = model_registry.save('forecaster', forecaster)
+        self.models['predictor'] = forecaster
+        detector = self.train_detector(df)
+        if detector is not None:
+            model_registry.save('anomaly_detector', detector)
+        # Breakdown forecasters only refit the series whose data changed
+        for columns in [['TypeOfWaste'], ['Disposition'], ['TypeOfWaste', 'Disposition']]:
+            if model_registry.current_version('forecaster_by_' + '_'.join(columns)) is not None:
+                self.retrain_series_forecasters(df, columns)
+        self.save_models()
+        # Cached predictions came from the previous model version
+        result_cache.clear()
+        return version
+
+class ResultCache:
+    """LRU cache of analysis results keyed by analysis, parameters and data version"""
+
+    def __init__(self, max_entries=128, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Computations under way, by key, for callers that arrive meanwhile to wait on
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def make_key(self, analysis, params, version):
+        return (analysis, tuple(sorted(params.items())), version)
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry[0] <= self.ttl
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not self.is_fresh(entry):
+                if entry is not None:
+                    del self.entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, analysis, params, version, compute):
+        """Cached result for this data version, computing it on a miss
+        
+        Concurrent misses on the same key are single-flight: the first caller
+        computes and the others wait for its result (or its exception).
+        """
+        if version is None:
+            # Without a data version there is nothing safe to key on
+            metrics.inc('cache_requests_total', analysis=analysis, result='bypass')
+            with metrics.stage(analysis):
+                return compute()
+        key = self.make_key(analysis, params, version)
+        value = self.get(key)
+        if value is not None:
+            metrics.inc('cache_requests_total', analysis=analysis, result='hit')
+            return value
+        
+        with self.lock:
+            entry = self.entries.get(key)
+            # Stored by a computation that finished since the lookup above
+            if self.is_fresh(entry):
+                value = entry[1]
+            else:
+                flight = self.in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.in_flight[key] = {'done': threading.Event(), 'value': None, 'error': None}
+                else:
+                    self.coalesced += 1
+        if value is not None:
+            metrics.inc('cache_requests_total', analysis=analysis, result='hit')
+            return value
+        
+        if not leader:
+            metrics.inc('cache_requests_total', analysis=analysis, result='coalesced')
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+        
+        metrics.inc('cache_requests_total', analysis=analysis, result='miss')
+        try:
+            with metrics.stage(analysis):
+                value = compute()
+            if value is not None:
+                self.put(key, value)
+            flight['value'] = value
+            return value
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight['done'].set()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+            }
+
+def model_versions(names):
+    """Cache key parameters naming the current version of each model a result was computed with
+    
+    The version pointers are shared by every worker, so a retrain in one worker
+    also retires the results the other workers cached from the old models.
+    """
+    return {f'model:{name}': model_registry.current_version(name) for name in names}
+
+class AnalyticsScheduler:
+    """Recomputes a payload in the background and keeps the latest snapshot"""
+
+    def __init__(self, compute, data_version=None, interval=300, poll_interval=30, name='analytics-scheduler',
+                 on_update=None):
+        self.compute = compute
+        self.data_version = data_version
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.name = name
+        # Called with each new snapshot, e.g. to push it to subscribers
+        self.on_update = on_update
+        self.snapshot = None
+        self.thread = None
+        self.lock = threading.Lock()
+        # Held while a computation runs so concurrent callers never start a second one
+        self.refreshing = threading.Lock()
+        self.wake = threading.Event()
+
+    def start(self):
+        """Start the worker thread once per process"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                if self.is_due():
+                    self.refresh()
+            except Exception as e:
+                print(f"Scheduled {self.name} error: {e}")
+                metrics.inc('errors_total', source=self.name)
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+
+    def is_stale(self, snapshot):
+        return time.time() - snapshot['timestamp'] >= self.interval
+
+    def is_due(self):
+        """Recompute on the interval or as soon as the table changes"""
+        snapshot = self.snapshot
+        if snapshot is None or self.is_stale(snapshot):
+            return True
+        if self.data_version is None:
+            return False
+        version = self.data_version()
+        return version is not None and version != snapshot['data_version']
+
+    def compute_snapshot(self):
+        version = self.data_version() if self.data_version else None
+        with metrics.stage(self.name):
+            data = self.compute()
+        self.snapshot = {
+            'data': data,
+            'data_version': version,
+            'timestamp': time.time(),
+            'generated_at': datetime.now().isoformat()
+        }
+        if self.on_update is not None:
+            self.on_update(self.snapshot)
+
+    def refresh(self):
+        """Recompute unless another computation is already running"""
+        if not self.refreshing.acquire(blocking=False):
+            return False
+        try:
+            self.compute_snapshot()
+            return True
+        finally:
+            self.refreshing.release()
+
+    def notify(self):
+        """Ask the worker to check for changes right away"""
+        self.wake.set()
+
+    def get(self):
+        """Latest snapshot; stale ones are served while a refresh runs"""
+        self.start()
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self.refreshing:
+                if self.snapshot is None:
+                    self.compute_snapshot()
+            return self.snapshot
+        if self.is_stale(snapshot):
+            self.notify()
+        return snapshot
+
+class AdmissionLimiter:
+    """Caps concurrent requests to one endpoint; a few more may wait, the rest are turned away"""
+
+    def __init__(self, concurrency=2, queue_size=2, queue_timeout=5):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self):
+        """Take a slot, waiting up to queue_timeout; returns None when admitted, else why not"""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                if self.waiting >= self.queue_size:
+                    return 'queue_full'
+                self.waiting += 1
+            try:
+                admitted = self.slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+            if not admitted:
+                return 'timeout'
+        with self.lock:
+            self.active += 1
+        return None
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+        self.slots.release()
+
+class EventBroadcaster:
+    """Fans server-sent events out to the stream clients connected to this process"""
+
+    def __init__(self, max_clients=50, backlog=16):
+        self.max_clients = max_clients
+        self.backlog = backlog
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Queue of encoded events for a new client, or None when full"""
+        with self.lock:
+            if len(self.subscribers) >= self.max_clients:
+                return None
+            subscriber = queue.Queue(maxsize=self.backlog)
+            self.subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def encode(self, event, data):
+        return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+    def publish(self, event, data):
+        message = self.encode(event, data)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A client that stopped reading misses events rather than holding up the rest
+                pass
 
 # Initialize ML Analytics
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('ML_CACHE_SIZE', 128)),
+    ttl=float(os.environ.get('ML_CACHE_TTL', 600))
+)
 ml_analytics = WasteMLAnalytics()
+# Threads per gthread worker, as set for gunicorn.conf.py
+WORKER_THREADS = int(os.environ.get('ML_THREADS', 16))
+# Per worker process. Each expensive endpoint has its own limit, and all of them
+# together share one more, so that with streams holding up to half of the
+# threads, expensive requests running or queued still leave some for cheap ones
+ENDPOINT_CONCURRENCY = int(os.environ.get('ML_ENDPOINT_CONCURRENCY', 2))
+ADMISSION_QUEUE = int(os.environ.get('ML_ADMISSION_QUEUE', 1))
+ADMISSION_TIMEOUT = float(os.environ.get('ML_ADMISSION_TIMEOUT', 5))
+RETRY_AFTER = int(os.environ.get('ML_RETRY_AFTER', 5))
+# Expensive endpoints by view name and how many of each may run at once
+ADMISSION_LIMITS = {
+    'get_ml_analytics': ENDPOINT_CONCURRENCY,
+    'get_predictions': ENDPOINT_CONCURRENCY,
+    'get_anomalies': ENDPOINT_CONCURRENCY,
+    'score_anomalies': ENDPOINT_CONCURRENCY,
+    'get_summary': ENDPOINT_CONCURRENCY,
+    'predict': ENDPOINT_CONCURRENCY,
+    'anomalies': ENDPOINT_CONCURRENCY,
+    'recommendations': ENDPOINT_CONCURRENCY,
+    'retrain_models': 1,
+}
+admission_limiters = {
+    endpoint: AdmissionLimiter(concurrency, ADMISSION_QUEUE, ADMISSION_TIMEOUT)
+    for endpoint, concurrency in ADMISSION_LIMITS.items()
+}
+shared_admission = AdmissionLimiter(
+    int(os.environ.get('ML_EXPENSIVE_CONCURRENCY', max(1, WORKER_THREADS // 4))),
+    int(os.environ.get('ML_EXPENSIVE_QUEUE', WORKER_THREADS // 8)),
+    ADMISSION_TIMEOUT
+)
+# Every open stream holds a worker thread for as long as it stays connected,
+# so by default streams get half of them and the rest keep serving the API
+event_broadcaster = EventBroadcaster(
+    max_clients=int(os.environ.get('ML_STREAM_MAX_CLIENTS', max(1, WORKER_THREADS // 2)))
+)
+STREAM_HEARTBEAT = float(os.environ.get('ML_STREAM_HEARTBEAT', 15))
+analytics_scheduler = AnalyticsScheduler(
+    ml_analytics.full_analysis,
+    ml_analytics.frame_store.data_version,
+    interval=float(os.environ.get('ML_SNAPSHOT_INTERVAL', 300)),
+    poll_interval=float(os.environ.get('ML_SNAPSHOT_POLL_INTERVAL', 30)),
+    on_update=lambda snapshot: event_broadcaster.publish('analytics', {
+        'generated_at': snapshot['generated_at'],
+        'data_version': snapshot['data_version']
+    })
+)
+DETECTOR_REFIT_INTERVAL = float(os.environ.get('ML_DETECTOR_REFIT_INTERVAL', 3600))
+detector_refresher = AnalyticsScheduler(
+    lambda: ml_analytics.refresh_detector(DETECTOR_REFIT_INTERVAL),
+    interval=DETECTOR_REFIT_INTERVAL,
+    poll_interval=min(DETECTOR_REFIT_INTERVAL, 300),
+    name='detector-refit'
+)
+
+change_journal = ChangeJournal(CHANGE_JOURNAL, CHANGE_JOURNAL_MAX_BYTES)
+change_lock = threading.Lock()
+
+def apply_pushed_changes():
+    """Apply journal entries this process has not seen yet; True when its data changed"""
+    with change_lock:
+        entries = change_journal.read_new()
+        if entries is None:
+            # The journal was rotated under us, so some changes may have been missed
+            ml_analytics.frame_store.invalidate()
+            changed = True
+        elif not entries:
+            return False
+        else:
+            upserted, deleted = set(), set()
+            for entry in entries:
+                upserted.update(entry.get('upserted', []))
+                deleted.update(entry.get('deleted', []))
+            changed = ml_analytics.frame_store.apply_changes(upserted, deleted)
+            metrics.inc('changes_applied_total', len(upserted | deleted))
+    if changed:
+        analytics_scheduler.notify()
+        if event_broadcaster.has_subscribers():
+            event_broadcaster.publish('summary', ml_analytics.live_summary())
+    return changed
+
+# Follows the journal in every worker; interval=0 makes each poll due
+change_follower = AnalyticsScheduler(
+    apply_pushed_changes,
+    interval=0,
+    poll_interval=CHANGE_POLL_INTERVAL,
+    name='change-feed'
+)
+
+def start_background_jobs():
+    """Start the snapshot, refit and change-feed threads on first use in each process"""
+    analytics_scheduler.start()
+    detector_refresher.start()
+    change_follower.start()
+
+readiness = {'models_loaded': False, 'warmed_up': False}
+
+def warm_up(compute_snapshot=True):
+    """Load models, data and the first snapshot without starting any threads
+    
+    Under a preloading server this runs once in the master, so workers inherit
+    the loaded state copy-on-write instead of each building their own.
+    """
+    preload_dependencies()
+    for name in ['forecaster', 'anomaly_detector', 'clusterer']:
+        model_registry.load_current(name)
+    ml_analytics.load_models()
+    readiness['models_loaded'] = True
+    
+    if compute_snapshot:
+        try:
+            with analytics_scheduler.refreshing:
+                analytics_scheduler.compute_snapshot()
+        except Exception as e:
+            print(f"Warm-up snapshot error: {e}")
+            metrics.inc('errors_total', source='warm_up')
+
+def before_fork():
+    """Release resources that must not be shared with forked workers"""
+    db_pool.close()
+
+def after_fork():
+    """Reset per-process state in a freshly forked worker"""
+    global analysis_pool
+    # Threads do not survive fork, so executors and schedulers start over
+    analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix='analysis')
+    analytics_scheduler.thread = None
+    detector_refresher.thread = None
+    change_follower.thread = None
+    db_pool.after_fork()
+    # Counters start from zero in each worker rather than repeating the master's
+    metrics.reset()
+
+def warm_up_worker():
+    """Finish warming a worker before it accepts requests"""
+    if not readiness['models_loaded']:
+        warm_up()
+    elif analytics_scheduler.snapshot is None:
+        warm_up(compute_snapshot=True)
+    start_background_jobs()
+    readiness['warmed_up'] = True
+
+# Held by the one request that may run cProfile at a time
+profiler_lock = threading.Lock()
+
+def profile_requested():
+    return PROFILING_ENABLED and (
+        request.args.get('profile') == '1' or request.headers.get('X-ML-Profile') == '1'
+    )
+
+def finish_profile():
+    """Stop profiling the current request; returns its stage timings and profiler"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        profiler_lock.release()
+    token = g.pop('profile_token', None)
+    if token is None:
+        return None, None
+    stages = active_profile.get()
+    active_profile.reset(token)
+    return stages, profiler
+
+def response_encoding():
+    """Best compression the client accepts: br when brotli is installed, else gzip"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+# after_request hooks run in reverse order of registration, so this one is
+# registered first to see the body only after the profile has been attached
+@app.after_request
+def compress_response(response):
+    """Compress large JSON bodies for clients that send Accept-Encoding"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = response_encoding()
+    if encoding is None:
+        return response
+    
+    with metrics.stage('compress'):
+        if encoding == 'br':
+            body = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            body = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    metrics.inc('compressed_bytes_total', len(body), encoding=encoding)
+    return response
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    if profile_requested():
+        g.profile_token = active_profile.set([])
+        # cProfile only supports one active profiler; others still get stage timings
+        if profiler_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+@app.before_request
+def admit_request():
+    """Shed load on expensive endpoints with 503 and Retry-After instead of piling up
+    
+    The shared limit is taken first, so it bounds every thread held in
+    admission, including those waiting for their endpoint's own limit.
+    """
+    limiter = admission_limiters.get(request.endpoint)
+    if limiter is None or request.method == 'OPTIONS':
+        return None
+    start = time.perf_counter()
+    # Released in teardown, which also runs when a limit below refuses the request
+    g.admission = []
+    for name, each in [('shared', shared_admission), ('endpoint', limiter)]:
+        refused = each.acquire()
+        if refused is not None:
+            break
+        g.admission.append(each)
+    metrics.observe('admission_wait_seconds', time.perf_counter() - start, endpoint=request.endpoint)
+    if refused is not None:
+        metrics.inc('requests_shed_total', endpoint=request.endpoint, limit=name, reason=refused)
+        return jsonify({
+            'success': False,
+            'message': 'The ML service is busy, please retry shortly'
+        }), 503, {'Retry-After': str(RETRY_AFTER)}
+    return None
+
+@app.after_request
+def record_request_metrics(response):
+    stages, profiler = finish_profile()
+    if stages is not None:
+        data = response.get_json(silent=True)
+        if isinstance(data, dict):
+            report = {'stages': stages}
+            if profiler is not None:
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+                report['functions'] = stream.getvalue()
+            data['profile'] = report
+            response.set_data(app.json.dumps(data))
+    
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    metrics.observe('request_duration_seconds', elapsed, endpoint=endpoint, method=request.method)
+    metrics.inc('requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.inc('response_bytes_total', response.content_length or 0, endpoint=endpoint)
+    return response
+
+@app.teardown_request
+def teardown_request_metrics(exc):
+    # after_request is skipped when a view raises, so make sure profiling stops
+    finish_profile()
+    # Endpoint slot first, then the shared one taken before it
+    for limiter in reversed(g.pop('admission', [])):
+        limiter.release()
+
+def collect_scrape_metrics():
+    """Gauges that are cheaper to read at scrape time than to keep current"""
+    cache_stats = result_cache.stats()
+    metrics.set('result_cache_entries', cache_stats['entries'])
+    metrics.set('result_cache_hit_ratio', cache_stats['hit_rate'])
+    metrics.set('result_cache_evictions', cache_stats['evictions'])
+    metrics.set('stream_clients', len(event_broadcaster.subscribers))
+    metrics.set('result_cache_coalesced', cache_stats['coalesced'])
+    for endpoint, limiter in [*admission_limiters.items(), ('all', shared_admission)]:
+        metrics.set('admission_active', limiter.active, endpoint=endpoint)
+        metrics.set('admission_waiting', limiter.waiting, endpoint=endpoint)
+    frames = {'store': ml_analytics.frame_store.frame, 'prepared': ml_analytics.prepared[1]}
+    for name, frame in frames.items():
+        if frame is not None:
+            metrics.set('frame_rows', len(frame), frame=name)
+            metrics.set('frame_memory_bytes', int(frame.memory_usage(deep=True).sum()), frame=name)
+    for scheduler in [analytics_scheduler, detector_refresher]:
+        snapshot = scheduler.snapshot
+        if snapshot is not None:
+            metrics.set('snapshot_age_seconds', round(time.time() - snapshot['timestamp'], 3), job=scheduler.name)
+
+@app.route('/api/ml/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint; each worker process reports its own values"""
+    collect_scrape_metrics()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/ml/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/ml/ready', methods=['GET'])
+def ready():
+    """Readiness: models loaded and a snapshot available to serve"""
+    snapshot = analytics_scheduler.snapshot
+    checks = {
+        'models_loaded': readiness['models_loaded'],
+        'warmed_up': readiness['warmed_up'],
+        # A snapshot without a data version was computed while the database was unreachable
+        'snapshot': snapshot is not None and snapshot['data_version'] is not None
+    }
+    is_ready = all(checks.values())
+    return jsonify({'ready': is_ready, 'checks': checks}), 200 if is_ready else 503
 
 @app.route('/api/ml/analytics', methods=['GET'])
 def get_ml_analytics():
     """Main endpoint for ML analytics"""
     try:
-        # Fetch real-time data
-        df = ml_analytics.fetch_real_time_data()
+        start_background_jobs()
+        filters = parse_filters(request.args)
+        if filters:
+            # Filtered views run on their slice and are cached per data version
+            models = ml_analytics.forecast_models(filters=filters) + ['anomaly_detector', 'clusterer']
+            snapshot = result_cache.get_or_compute(
+                'analytics', {**filter_params(filters), **model_versions(models)},
+                ml_analytics.frame_store.data_version(),
+                lambda: {'data': ml_analytics.full_analysis(filters), 'generated_at': datetime.now().isoformat()}
+            )
+        else:
+            # Served from the background snapshot; only the very first call computes inline
+            snapshot = analytics_scheduler.get()
         
-        if df is None or df.empty:
+        if snapshot['data'] is None:
             return jsonify({
                 'success': False,
                 'message': 'No data available',
                 'data': {}
             })
         
-        # Preprocess data
-        df = ml_analytics.preprocess_data(df)
-        
-        # Perform ML analysis
-        predictions = ml_analytics.time_series_prediction(df)
-        anomalies = ml_analytics.anomaly_detection(df)
-        clusters = ml_analytics.waste_clustering(df)
-        seasonal = ml_analytics.seasonal_analysis(df)
-        optimization = ml_analytics.optimization_recommendations(df)
-        
         return jsonify({
             'success': True,
-            'data': {
-                'predictions': predictions,
-                'anomalies': anomalies,
-                'clusters': clusters,
-                'seasonal_analysis': seasonal,
-                'optimization': optimization,
-                'data_stats': {
-                    'total_records': len(df),
-                    'date_range': {
-                        'start': df['created_at'].min().strftime('%Y-%m-%d'),
-                        'end': df['created_at'].max().strftime('%Y-%m-%d')
-                    },
-                    'total_weight_kg': round(df['weight_kg'].sum(), 2)
-                }
-            }
+            'generated_at': snapshot['generated_at'],
+            'filters': filter_params(filters),
+            'data': snapshot['data']
         })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e), 'data': {}}), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -466,20 +2875,48 @@ def get_ml_analytics():
 def get_predictions():
     """Get waste predictions"""
     try:
-        days_ahead = int(request.args.get('days', 7))
-        df = ml_analytics.fetch_real_time_data()
+        days_ahead = max(1, min(int(request.args.get('days', 7)), MAX_FORECAST_DAYS))
+        breakdown = request.args.get('breakdown')
+        filters = parse_filters(request.args)
+        params = filter_params(filters)
+        version, df = ml_analytics.filtered_data(filters)
         
         if df is None:
             return jsonify({'success': False, 'predictions': []})
         
-        df = ml_analytics.preprocess_data(df)
-        predictions = ml_analytics.time_series_prediction(df, days_ahead)
-        
-        return jsonify({
+        predictions = result_cache.get_or_compute(
+            'predictions',
+            {'days': days_ahead, **params, **model_versions(ml_analytics.forecast_models(filters=filters))},
+            version,
+            lambda: ml_analytics.time_series_prediction(df, days_ahead, filters)
+        )
+        response = {
             'success': True,
+            'filters': params,
             'predictions': predictions
-        })
+        }
+        
+        if breakdown:
+            requested = breakdown.split(',')
+            by = [col for name, col in BREAKDOWN_COLUMNS.items() if name in requested]
+            if not by:
+                return jsonify({
+                    'success': False,
+                    'message': f"breakdown must be one or more of: {', '.join(BREAKDOWN_COLUMNS)}",
+                    'predictions': []
+                }), 400
+            response['breakdown'] = result_cache.get_or_compute(
+                'predictions_breakdown',
+                {'days': days_ahead, 'by': ','.join(by), **params,
+                 **model_versions(ml_analytics.forecast_models(by, filters))},
+                version,
+                lambda: ml_analytics.breakdown_prediction(df, by, days_ahead, filters)
+            )
+        
+        return jsonify(response)
     
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e), 'predictions': []}), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -489,49 +2926,212 @@ def get_predictions():
 
 @app.route('/api/ml/anomalies', methods=['GET'])
 def get_anomalies():
-    """Get anomaly detection results"""
+    """Get anomaly detection results, most anomalous first
+    
+    ?offset= and ?limit= page through the full list (limit=all for every
+    entry, default the top ANOMALY_PAGE_SIZE), ?format=columns returns
+    {field: [values]} instead of a list of objects, and ?stream=1 writes
+    the page as newline-delimited JSON, one entry per line.
+    """
     try:
-        df = ml_analytics.fetch_real_time_data()
+        start_background_jobs()
+        filters = parse_filters(request.args)
+        params = filter_params(filters)
+        offset, limit = parse_page(request.args, ANOMALY_PAGE_SIZE)
+        layout = request.args.get('format', 'records')
+        if layout not in ('records', 'columns'):
+            raise ValueError("'format' must be records or columns")
+        version, df = ml_analytics.filtered_data(filters)
         
         if df is None:
             return jsonify({'success': False, 'anomalies': []})
         
-        df = ml_analytics.preprocess_data(df)
-        anomalies = ml_analytics.anomaly_detection(df)
+        # Every page of a version is cut from one cached, fully scored frame
+        frame = result_cache.get_or_compute(
+            'anomaly_frame', {**params, **model_versions(['anomaly_detector'])}, version,
+            lambda: ml_analytics.anomaly_frame(df, filters)
+        )
+        total = len(frame)
+        page = frame.iloc[offset:] if limit is None else frame.iloc[offset:offset + limit]
+        
+        if request.args.get('stream') == '1':
+            def lines():
+                for start in range(0, len(page), STREAM_CHUNK_ROWS):
+                    chunk = frame_records(page.iloc[start:start + STREAM_CHUNK_ROWS])
+                    yield ''.join(encode_json(record) + '\n' for record in chunk)
+            
+            return Response(lines(), mimetype='application/x-ndjson', headers={
+                'X-Total-Count': str(total)
+            })
         
+        end = offset + len(page)
         return jsonify({
             'success': True,
-            'anomalies': anomalies
+            'filters': params,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': end if end < total else None,
+            'anomalies': frame_columns(page) if layout == 'columns' else frame_records(page)
         })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e), 'anomalies': []}), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'message': str(e),
             'anomalies': []
         }), 500
+
+@app.route('/api/ml/anomalies/score', methods=['POST'])
+def score_anomalies():
+    """Score one waste record or a batch against the current anomaly detector"""
+    try:
+        start_background_jobs()
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            records = payload.get('records', [payload])
+        else:
+            records = payload or []
+        
+        if not records:
+            return jsonify({'success': False, 'message': 'No records to score', 'results': []}), 400
+        
+        version, results = ml_analytics.score_records(records)
+        
+        if version is None:
+            return jsonify({'success': False, 'message': 'No anomaly detector trained yet', 'results': []}), 503
+        
+        return jsonify({
+            'success': True,
+            'model_version': version,
+            'results': results
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e), 'results': []}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'results': []
+        }), 500
+
+@app.route('/api/ml/summary', methods=['GET'])
+def get_summary():
+    """Daily, hourly and per-type totals of the rows matching the filters"""
+    try:
+        filters = parse_filters(request.args)
+        params = filter_params(filters)
+        version = ml_analytics.frame_store.data_version()
+        summary = result_cache.get_or_compute(
+            'summary', params, version,
+            lambda: ml_analytics.summary_aggregates(filters).to_dict()
+        )
+        
+        return jsonify({
+            'success': True,
+            'filters': params,
+            'summary': summary
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e), 'summary': {}}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'summary': {}
+        }), 500
+
+@app.route('/api/ml/changes', methods=['POST'])
+def post_changes():
+    """Row ids Laravel created, updated or deleted, applied without polling the table"""
+    if not CHANGE_TOKEN:
+        return jsonify({
+            'success': False,
+            'message': 'Change notifications are disabled; set ML_CHANGE_TOKEN to the secret Laravel sends'
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-ML-Token', ''), CHANGE_TOKEN):
+        return jsonify({'success': False, 'message': 'Invalid change token'}), 401
+    try:
+        payload = request.get_json(silent=True) or {}
+        upserted = payload.get('upserted', [])
+        deleted = payload.get('deleted', [])
+        if not all(isinstance(ids, list) and all(isinstance(i, int) for i in ids) for ids in [upserted, deleted]):
+            return jsonify({'success': False, 'message': 'upserted and deleted must be lists of ids'}), 400
+        if len(upserted) + len(deleted) > CHANGE_MAX_IDS:
+            return jsonify({'success': False, 'message': f'At most {CHANGE_MAX_IDS} ids per request'}), 400
+        
+        start_background_jobs()
+        if upserted or deleted:
+            change_journal.append(upserted, deleted)
+        # Apply here right away; other workers pick the entry up from the journal
+        applied = apply_pushed_changes()
+        
+        return jsonify({
+            'success': True,
+            'applied': applied,
+            'data_version': ml_analytics.frame_store.data_version()
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/ml/stream', methods=['GET'])
+def stream_events():
+    """Server-sent events: 'summary' after every pushed change, 'analytics' when a snapshot is ready"""
+    start_background_jobs()
+    subscriber = event_broadcaster.subscribe()
+    if subscriber is None:
+        return jsonify({'success': False, 'message': 'Too many stream clients'}), 503, {'Retry-After': str(RETRY_AFTER)}
+    
+    def events():
+        try:
+            yield event_broadcaster.encode('summary', ml_analytics.live_summary())
+            while True:
+                try:
+                    yield subscriber.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Comment lines keep proxies from closing an idle stream
+                    yield ': keep-alive\n\n'
+        finally:
+            event_broadcaster.unsubscribe(subscriber)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/predict', methods=['GET'])
 def predict():
-    analytics = WasteMLAnalytics()
-    df = analytics.fetch_real_time_data()
-    df = analytics.preprocess_data(df)
-    prediction = analytics.time_series_prediction(df)
+    version, df = ml_analytics.prepared_data()
+    prediction = result_cache.get_or_compute(
+        'predictions', {'days': 7, **model_versions(['forecaster'])}, version,
+        lambda: ml_analytics.time_series_prediction(df)
+    )
     return jsonify(prediction)
 
 @app.route('/anomalies', methods=['GET'])
 def anomalies():
-    analytics = WasteMLAnalytics()
-    df = analytics.fetch_real_time_data()
-    df = analytics.preprocess_data(df)
-    results = analytics.anomaly_detection(df)
+    version, df = ml_analytics.prepared_data()
+    results = result_cache.get_or_compute(
+        'anomalies', model_versions(['anomaly_detector']), version,
+        lambda: ml_analytics.anomaly_detection(df)
+    )
     return jsonify(results)
 
 @app.route('/recommendations', methods=['GET'])
 def recommendations():
-    analytics = WasteMLAnalytics()
-    df = analytics.fetch_real_time_data()
-    df = analytics.preprocess_data(df)
-    results = analytics.optimization_recommendations(df)
+    version, df = ml_analytics.prepared_data()
+    results = result_cache.get_or_compute(
+        'recommendations', {}, version,
+        lambda: ml_analytics.optimization_recommendations(df)
+    )
     return jsonify(results)
 
 # etc.
@@ -540,20 +3140,24 @@ def recommendations():
 def retrain_models():
     """Retrain ML models with latest data"""
     try:
-        df = ml_analytics.fetch_real_time_data()
+        _, df = ml_analytics.prepared_data()
         
         if df is None:
             return jsonify({'success': False, 'message': 'No data available for training'})
         
-        df = ml_analytics.preprocess_data(df)
+        version = ml_analytics.retrain(df)
         
-        # Retrain models (simplified version)
-        # In production, you'd want more sophisticated retraining logic
-        ml_analytics.save_models()
+        if version is None:
+            return jsonify({
+                'success': False,
+                'message': 'Not enough history to train the forecasting models',
+                'training_data_size': len(df)
+            })
         
         return jsonify({
             'success': True,
             'message': 'Models retrained successfully',
+            'model_version': version,
             'training_data_size': len(df)
         })
     
@@ -564,4 +3168,6 @@ def retrain_models():
         }), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server; use gunicorn.conf.py / wsgi.py in production
+    warm_up_worker()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', use_reloader=False, host='0.0.0.0', port=5000)
\ No newline at end of file
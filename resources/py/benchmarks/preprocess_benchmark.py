@@ -0,0 +1,42 @@
+# preprocess_benchmark.py - rows/sec of WasteMLAnalytics.preprocess_data
+#
+# Usage: python resources/py/benchmarks/preprocess_benchmark.py [--rows 10000 1000000 10000000]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import WasteMLAnalytics
+from synthetic import make_frame
+
+def legacy_weights(analytics, df):
+    """The original row-wise conversion, kept for comparison"""
+    return df.apply(lambda row: analytics.convert_to_kg(row['Weight'], row['Unit']), axis=1)
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark preprocess_data throughput')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--legacy-max', type=int, default=1_000_000,
+                        help='largest size to also time the row-wise apply on')
+    args = parser.parse_args()
+
+    analytics = WasteMLAnalytics()
+    print(f"{'rows':>12} {'preprocess rows/s':>20} {'weights rows/s':>18} {'legacy weights rows/s':>24}")
+    for rows in args.rows:
+        df = make_frame(rows)
+
+        preprocess = timed(lambda: analytics.preprocess_data(df.copy()))
+        weights = timed(lambda: analytics.weights_to_kg(df['Weight'], df['Unit']))
+        legacy = timed(lambda: legacy_weights(analytics, df)) if rows <= args.legacy_max else None
+
+        legacy_text = f"{rows / legacy:>24,.0f}" if legacy else f"{'skipped':>24}"
+        print(f"{rows:>12,} {rows / preprocess:>20,.0f} {rows / weights:>18,.0f} {legacy_text}")
+
+if __name__ == '__main__':
+    main()
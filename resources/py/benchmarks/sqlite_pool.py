@@ -0,0 +1,52 @@
+# sqlite_pool.py - a SQLite file served through the service's DatabasePool interface
+#
+# Kept free of numpy and pandas so start-up benchmarks can use it without
+# importing them ahead of the service.
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+# Parse TIMESTAMP columns back into datetimes, as mysql.connector does
+sqlite3.register_converter('timestamp', lambda value: datetime.fromisoformat(value.decode()))
+
+class SQLiteCursor:
+    """Cursor that accepts the %s placeholders the service writes for MySQL"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=None):
+        return self.cursor.execute(query.replace('%s', '?'), tuple(params or ()))
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+class SQLitePool:
+    """Drop-in for DatabasePool: connection() lends a connection to the SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def connection(self):
+        connection = SQLiteConnection(self.path)
+        try:
+            yield connection
+        finally:
+            connection.close()
@@ -0,0 +1,86 @@
+# startup_benchmark.py - cold-start cost of the ML service
+#
+# Each measurement runs in a fresh interpreter so nothing is already imported.
+# The service reads a SQLite stand-in filled with synthetic rows, and its models
+# are trained by one untimed run first, so the first request loads them rather
+# than fitting them.
+#
+# Usage: python resources/py/benchmarks/startup_benchmark.py [--runs 5] [--rows 10000]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, BENCH_DIR)
+
+# Stages timed inside the child; each prints "<stage> <seconds>". A cold child
+# times the first analytics request, which pays for every lazy import, the data
+# load and the model load; a warm child times the same request after warm_up.
+CHILD = r'''
+import sys, time
+sys.path.insert(0, {app_dir!r})
+sys.path.insert(0, {bench_dir!r})
+from sqlite_pool import SQLitePool
+start = time.perf_counter()
+import app
+print('import', time.perf_counter() - start)
+app.ml_analytics.db = SQLitePool({db_path!r})
+client = app.app.test_client()
+
+if {warm!r}:
+    start = time.perf_counter()
+    app.warm_up(compute_snapshot=False)
+    print('warm_up', time.perf_counter() - start)
+
+start = time.perf_counter()
+response = client.get('/api/ml/predictions')
+assert response.status_code == 200, response.get_data(as_text=True)
+print('warm_predictions' if {warm!r} else 'first_predictions', time.perf_counter() - start)
+'''
+STAGES = ('import', 'first_predictions', 'warm_up', 'warm_predictions')
+
+def run_child(workdir, warm):
+    code = CHILD.format(app_dir=APP_DIR, bench_dir=BENCH_DIR,
+                        db_path=os.path.join(workdir, 'wastes.sqlite'), warm=warm)
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, 'ML_MODEL_DIR': os.path.join(workdir, 'models')},
+    ).stdout
+    timings = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] in STAGES:
+            timings[parts[0]] = float(parts[1])
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ML service start-up')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    from synthetic import load_sqlite
+
+    with tempfile.TemporaryDirectory(prefix='smms-startup-') as workdir:
+        load_sqlite(os.path.join(workdir, 'wastes.sqlite'), args.rows)
+        # Train and register the models once, outside the measurements
+        run_child(workdir, warm=False)
+
+        runs = {}
+        for _ in range(args.runs):
+            for warm in (False, True):
+                for stage, seconds in run_child(workdir, warm).items():
+                    runs.setdefault(stage, []).append(seconds)
+
+    print(f"{'stage':>18} {'median s':>10} {'min s':>10} {'max s':>10}")
+    for stage in STAGES:
+        values = runs[stage]
+        print(f"{stage:>18} {statistics.median(values):>10.3f} {min(values):>10.3f} {max(values):>10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+# suite.py - times every WasteMLAnalytics method and Flask route on synthetic data
+#
+# Each scale runs in a fresh interpreter against its own SQLite stand-in and
+# model directory, and results are written as JSON so runs can be compared.
+#
+# Usage: python resources/py/benchmarks/suite.py [--rows 10000 100000] [--repeat 3]
+#                                                [--output results.json] [--baseline old.json]
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+# Change posts are refused without a shared token, so the child runs with one
+CHANGE_TOKEN = 'benchmark'
+
+# Flask routes and the requests used to exercise them: (rule, method, path, json body)
+SCORE_SAMPLE = 100
+ROUTE_CASES = [
+    ('/api/ml/health', 'GET', '/api/ml/health', None),
+    ('/api/ml/ready', 'GET', '/api/ml/ready', None),
+    ('/api/ml/metrics', 'GET', '/api/ml/metrics', None),
+    ('/api/ml/analytics', 'GET', '/api/ml/analytics', None),
+    ('/api/ml/analytics', 'GET', '/api/ml/analytics?from=2024-01-01&to=2024-03-31', None),
+    ('/api/ml/predictions', 'GET', '/api/ml/predictions', None),
+    ('/api/ml/predictions', 'GET', '/api/ml/predictions?days=90', None),
+    ('/api/ml/predictions', 'GET', '/api/ml/predictions?breakdown=type,disposition', None),
+    ('/api/ml/anomalies', 'GET', '/api/ml/anomalies', None),
+    ('/api/ml/anomalies', 'GET', '/api/ml/anomalies?from=2024-01-01&to=2024-03-31&type=Plastic', None),
+    ('/api/ml/anomalies', 'GET', '/api/ml/anomalies?limit=all', None),
+    ('/api/ml/anomalies', 'GET', '/api/ml/anomalies?limit=all&format=columns', None),
+    ('/api/ml/anomalies', 'GET', '/api/ml/anomalies?limit=all&stream=1', None),
+    ('/api/ml/anomalies/score', 'POST', '/api/ml/anomalies/score', 'records'),
+    ('/api/ml/summary', 'GET', '/api/ml/summary', None),
+    ('/api/ml/summary', 'GET', '/api/ml/summary?from=2024-01-01&to=2024-03-31&disposition=Landfill', None),
+    ('/api/ml/changes', 'POST', '/api/ml/changes', {'upserted': [1], 'deleted': []}),
+    ('/predict', 'GET', '/predict', None),
+    ('/anomalies', 'GET', '/anomalies', None),
+    ('/recommendations', 'GET', '/recommendations', None),
+    ('/api/ml/retrain', 'POST', '/api/ml/retrain', None),
+]
+
+def method_cases(app, ctx):
+    """(name, call, setup) for WasteMLAnalytics; setup's return value is passed to call untimed"""
+    a = app.ml_analytics
+    by = ['TypeOfWaste']
+
+    def cold_prepared():
+        a.prepared = (None, None)
+
+    def borrow_connection(_):
+        with a.connect_to_database():
+            pass
+
+    def uncached_filters():
+        a.slices.clear()
+        return app.parse_filters({'from': '2024-01-01', 'to': '2024-03-31', 'type': 'Plastic,Paper'})
+
+    return [
+        ('connect_to_database', borrow_connection, None),
+        ('frame_store.full_load', lambda _: a.frame_store.full_load(), None),
+        ('frame_store.load_delta', lambda _: a.frame_store.load_delta(), None),
+        ('frame_store.reconcile', lambda _: a.frame_store.reconcile(), None),
+        ('frame_store.data_version', lambda _: a.frame_store.data_version(), None),
+        ('fetch_real_time_data', lambda _: a.fetch_real_time_data(), None),
+        ('prepared_data (cold)', lambda _: a.prepared_data(), cold_prepared),
+        ('prepared_data (warm)', lambda _: a.prepared_data(), None),
+        ('filtered_data', lambda filters: a.filtered_data(filters), uncached_filters),
+        ('convert_to_kg (x1000)', lambda rows: [a.convert_to_kg(w, u) for w, u in rows],
+         lambda: list(zip(ctx['raw']['Weight'][:1000], ctx['raw']['Unit'][:1000]))),
+        ('weights_to_kg', lambda _: a.weights_to_kg(ctx['raw']['Weight'], ctx['raw']['Unit']), None),
+        ('add_date_features', lambda raw: a.add_date_features(raw), lambda: ctx['raw'].copy()),
+        ('preprocess_data', lambda raw: a.preprocess_data(raw), lambda: ctx['raw'].copy()),
+        ('rollup_rows', lambda _: a.rollup_rows(ctx['raw']), None),
+        ('rollup_for', lambda _: a.rollup_for(ctx['df'].copy(deep=False)), None),
+        ('daily_features', lambda _: a.daily_features(ctx['df']), None),
+        ('data_watermark', lambda _: a.data_watermark(ctx['df']), None),
+        ('train_forecaster', lambda _: a.train_forecaster(ctx['df']), None),
+        ('get_forecaster', lambda _: a.get_forecaster(ctx['df']), None),
+        ('time_series_prediction (7d)', lambda _: a.time_series_prediction(ctx['df'], 7), None),
+        ('time_series_prediction (365d)', lambda _: a.time_series_prediction(ctx['df'], 365), None),
+        ('breakdown_series', lambda _: a.breakdown_series(ctx['df'], by), None),
+        ('train_series_forecasters', lambda _: a.train_series_forecasters(ctx['df'], by), None),
+        ('retrain_series_forecasters', lambda _: a.retrain_series_forecasters(ctx['df'], by), None),
+        ('get_series_forecasters', lambda _: a.get_series_forecasters(ctx['df'], by), None),
+        ('breakdown_prediction', lambda _: a.breakdown_prediction(ctx['df'], by, 7), None),
+        ('anomaly_features', lambda _: a.anomaly_features(ctx['df']), None),
+        ('train_detector', lambda _: a.train_detector(ctx['df']), None),
+        ('get_detector', lambda _: a.get_detector(ctx['df']), None),
+        ('refresh_detector', lambda _: a.refresh_detector(), None),
+        ('score_anomalies', lambda detector: a.score_anomalies(ctx['df'], detector), lambda: a.get_detector(ctx['df'])),
+        (f'score_records (x{SCORE_SAMPLE})', lambda _: a.score_records(ctx['records']), None),
+        ('anomaly_detection', lambda _: a.anomaly_detection(ctx['df']), None),
+        ('anomaly_frame', lambda _: a.anomaly_frame(ctx['df']), None),
+        ('anomaly_reasons', lambda df: a.anomaly_reasons(df['weight_kg'].to_numpy(), df['hour'].to_numpy()),
+         lambda: ctx['df']),
+        ('get_anomaly_reason (x1000)', lambda rows: [a.get_anomaly_reason(row) for row in rows],
+         lambda: ctx['df'][['weight_kg', 'hour']].head(1000).to_dict('records')),
+        ('waste_clustering', lambda _: a.waste_clustering(ctx['df']), None),
+        ('seasonal_analysis', lambda _: a.seasonal_analysis(ctx['df']), None),
+        ('optimization_recommendations', lambda _: a.optimization_recommendations(ctx['df']), None),
+        ('stream_aggregates', lambda _: a.stream_aggregates(), None),
+        ('live_summary', lambda _: a.live_summary(), None),
+        ('run_analyses', lambda _: a.run_analyses(ctx['df']), None),
+        ('full_analysis', lambda _: a.full_analysis(), None),
+        ('retrain', lambda _: a.retrain(ctx['df']), None),
+        ('save_models', lambda _: a.save_models(), None),
+        ('load_models', lambda _: a.load_models(), None),
+    ]
+
+def summarize(times):
+    return {
+        'repeats': len(times),
+        'median_s': round(statistics.median(times), 6),
+        'min_s': round(min(times), 6),
+        'max_s': round(max(times), 6),
+    }
+
+def time_method(call, setup, repeat):
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        call(arg)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+def time_route(app, client, method, path, body, repeat):
+    """First request after clearing the result cache, then warm repeats"""
+    def send():
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers={'X-ML-Token': CHANGE_TOKEN})
+        # Streamed bodies are only produced as they are read
+        response.get_data()
+        return time.perf_counter() - start, response
+
+    app.result_cache.clear()
+    cold, response = send()
+    warm = [send()[0] for _ in range(repeat)]
+    return {'cold_s': round(cold, 6), 'status': response.status_code,
+            'response_bytes': len(response.get_data()), **summarize(warm)}
+
+def run_scale(rows, repeat, workdir):
+    """Benchmark one scale inside this process; app is imported here, after the environment is set"""
+    from sqlite_pool import SQLitePool
+    from synthetic import load_sqlite
+
+    db_path = os.path.join(workdir, 'wastes.sqlite')
+    start = time.perf_counter()
+    load_sqlite(db_path, rows)
+    load_seconds = time.perf_counter() - start
+
+    import app
+    # Point the shared service instance at the stand-in instead of MySQL
+    app.ml_analytics.db = SQLitePool(db_path)
+    app.warm_up()
+
+    ctx = {}
+    ctx['raw'] = app.ml_analytics.fetch_real_time_data()
+    ctx['df'] = app.ml_analytics.prepared_data()[1]
+    # Score payloads as Laravel would post them
+    ctx['records'] = json.loads(ctx['raw'].head(SCORE_SAMPLE).to_json(orient='records', date_format='iso'))
+
+    results = [{'rows': rows, 'kind': 'setup', 'name': 'load_sqlite', **summarize([load_seconds])}]
+    cases = method_cases(app, ctx)
+    for name, call, setup in cases:
+        entry = {'rows': rows, 'kind': 'method', 'name': name}
+        try:
+            entry.update(time_method(call, setup, repeat))
+        except Exception as e:
+            entry['error'] = f'{type(e).__name__}: {e}'
+        results.append(entry)
+
+    client = app.app.test_client()
+    for rule, method, path, body in ROUTE_CASES:
+        entry = {'rows': rows, 'kind': 'route', 'name': f'{method} {path}'}
+        try:
+            entry.update(time_route(app, client, method, path, ctx['records'] if body == 'records' else body, repeat))
+        except Exception as e:
+            entry['error'] = f'{type(e).__name__}: {e}'
+        results.append(entry)
+
+    for entry in results:
+        if 'median_s' in entry and entry['median_s'] > 0:
+            entry['rows_per_s'] = round(rows / entry['median_s'])
+
+    timed_methods = {name.split(' ')[0].split('.')[0] for name, _, _ in cases}
+    public = {name for name, _ in inspect.getmembers(app.WasteMLAnalytics, inspect.isfunction)
+              if not name.startswith('_')}
+    rules = {rule.rule for rule in app.app.url_map.iter_rules() if rule.endpoint != 'static'}
+    return {
+        'results': results,
+        'not_timed': {
+            'methods': sorted(public - timed_methods - {'frame_store'}),
+            'routes': sorted(rules - {rule for rule, _, _, _ in ROUTE_CASES}),
+        },
+    }
+
+def run_child(rows, repeat):
+    """Run one scale in a fresh interpreter with its own model directory"""
+    with tempfile.TemporaryDirectory(prefix=f'smms-bench-{rows}-') as workdir:
+        output = os.path.join(workdir, 'result.json')
+        env = {**os.environ, 'ML_MODEL_DIR': os.path.join(workdir, 'models'), 'ML_CHANGE_TOKEN': CHANGE_TOKEN}
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--rows', str(rows),
+             '--repeat', str(repeat), '--output', output, '--workdir', workdir],
+            env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+        with open(output) as f:
+            return json.load(f)
+
+def metadata():
+    import numpy
+    import pandas
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'started_at': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+def compare(results, baseline_path, threshold):
+    """Print median ratios against a previous run; returns the regressions"""
+    with open(baseline_path) as f:
+        baseline = {(r['rows'], r['kind'], r['name']): r for r in json.load(f)['results'] if 'median_s' in r}
+    regressions = []
+    print(f"\n{'rows':>10} {'kind':>7} {'name':<48} {'before s':>10} {'after s':>10} {'ratio':>7}")
+    for entry in results:
+        before = baseline.get((entry['rows'], entry['kind'], entry['name']))
+        if before is None or 'median_s' not in entry or not before['median_s']:
+            continue
+        ratio = entry['median_s'] / before['median_s']
+        flag = ' !' if ratio > threshold else ''
+        print(f"{entry['rows']:>10,} {entry['kind']:>7} {entry['name']:<48} "
+              f"{before['median_s']:>10.4f} {entry['median_s']:>10.4f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(entry)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every WasteMLAnalytics method and route')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help='table sizes to generate, e.g. 10000 1000000 10000000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='median slowdown ratio reported as a regression')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.output, 'w') as f:
+            json.dump(run_scale(args.rows[0], args.repeat, args.workdir), f)
+        return
+
+    report = {'meta': {**metadata(), 'repeat': args.repeat, 'rows': args.rows}, 'results': [], 'not_timed': {}}
+    for rows in args.rows:
+        print(f"Benchmarking {rows:,} rows...", flush=True)
+        scale = run_child(rows, args.repeat)
+        report['results'].extend(scale['results'])
+        report['not_timed'] = scale['not_timed']
+        for entry in scale['results']:
+            timing = f"{entry['median_s']:.4f}s" if 'median_s' in entry else entry.get('error')
+            print(f"  {entry['kind']:>7} {entry['name']:<48} {timing}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if any(report['not_timed'].values()):
+        print(f"Not timed: {report['not_timed']}")
+
+    if args.baseline and compare(report['results'], args.baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
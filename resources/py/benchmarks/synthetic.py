@@ -0,0 +1,91 @@
+# synthetic.py - realistic synthetic wastes data, loaded into SQLite for sqlite_pool.py
+#
+# Shared by the benchmarks; nothing here is imported by the service itself.
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+TYPES = ['Plastic', 'Paper', 'Metal', 'Glass', 'Organic', 'Electronic', 'Textile']
+TYPE_SHARE = [0.25, 0.2, 0.1, 0.1, 0.2, 0.05, 0.1]
+# Typical kg per entry, so an organic load weighs more than an electronics one
+TYPE_MEAN_KG = [4.0, 3.0, 6.0, 8.0, 12.0, 2.5, 3.5]
+DISPOSITIONS = ['Recycled', 'Composted', 'Landfill', 'Incinerated']
+DISPOSITION_SHARE = [0.4, 0.2, 0.3, 0.1]
+# Unit spellings found in hand-entered data, blanks included
+UNITS = ['kg', 'KG', 'kilograms', 'lbs', 'lb', 'g', 'grams', 'ton', 'tons', '', None]
+UNIT_SHARE = [0.45, 0.1, 0.05, 0.1, 0.05, 0.08, 0.02, 0.04, 0.02, 0.05, 0.04]
+UNIT_PER_KG = [1, 1, 1, 2.20462, 2.20462, 1000, 1000, 0.001, 0.001, 1, 1]
+USERS = [f'user{i}' for i in range(25)]
+SUPERVISORS = [f'supervisor{i}' for i in range(5)]
+# Most entries are logged during working hours
+HOUR_SHARE = np.array([1, 1, 1, 1, 1, 2, 4, 8, 10, 10, 9, 8, 6, 8, 9, 9, 8, 6, 4, 3, 2, 2, 1, 1], dtype=float)
+HOUR_SHARE /= HOUR_SHARE.sum()
+OUTLIER_RATE = 0.005
+
+# The service's column aliases that differ from the Laravel table's column names
+TABLE_COLUMNS = {'VerifiedBy': 'Verifiedby'}
+SQLITE_SCHEMA = """CREATE TABLE wastes (
+    id INTEGER PRIMARY KEY, TypeOfWaste TEXT, Disposition TEXT, Weight REAL, Unit TEXT,
+    InputBy TEXT, Verifiedby TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)"""
+# Same indexes as the Laravel migrations add
+SQLITE_INDEXES = ['created_at', 'TypeOfWaste', 'Disposition', 'updated_at']
+
+def iter_frames(rows, chunk_size=500_000, seed=42, start='2020-01-01', years=5):
+    """Yield synthetic rows shaped like fetch_real_time_data output, chunk by chunk
+
+    ids rise with created_at across chunks, like an append-only table.
+    """
+    rng = np.random.default_rng(seed)
+    origin = np.datetime64(start, 's')
+    span = int(years * 365 * 86400)
+    units = np.array(UNITS, dtype=object)
+    for offset in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - offset)
+        # Each chunk covers its own slice of the time range
+        low = span * offset // rows
+        high = max(span * (offset + n) // rows, low + 1)
+        days = rng.integers(low, high, n) // 86400
+        seconds = days * 86400 + rng.choice(24, n, p=HOUR_SHARE) * 3600 + rng.integers(0, 3600, n)
+        created = origin + np.sort(seconds).astype('timedelta64[s]')
+
+        type_codes = rng.choice(len(TYPES), n, p=TYPE_SHARE)
+        unit_codes = rng.choice(len(UNITS), n, p=UNIT_SHARE)
+        kg = rng.gamma(2.0, np.take(TYPE_MEAN_KG, type_codes) / 2.0)
+        kg[rng.random(n) < OUTLIER_RATE] *= 20
+        # 5% of rows were edited some time after they were entered
+        edited = rng.random(n) < 0.05
+        updated = created + np.where(edited, rng.integers(60, 30 * 86400, n), 0).astype('timedelta64[s]')
+        verified = np.where(rng.random(n) < 0.6, rng.choice(np.array(SUPERVISORS, dtype=object), n), None)
+
+        yield pd.DataFrame({
+            'id': np.arange(offset + 1, offset + n + 1),
+            'TypeOfWaste': np.take(np.array(TYPES, dtype=object), type_codes),
+            'Disposition': rng.choice(np.array(DISPOSITIONS, dtype=object), n, p=DISPOSITION_SHARE),
+            'Weight': (kg * np.take(UNIT_PER_KG, unit_codes)).round(2),
+            'Unit': units[unit_codes],
+            'InputBy': rng.choice(np.array(USERS, dtype=object), n),
+            'VerifiedBy': verified,
+            'created_at': created,
+            'updated_at': updated,
+        })
+
+def make_frame(rows, seed=42):
+    """All synthetic rows in one frame"""
+    return next(iter_frames(rows, chunk_size=max(rows, 1), seed=seed))
+
+def load_sqlite(path, rows, seed=42, chunk_size=500_000):
+    """Create the wastes table in a SQLite file and fill it with synthetic rows"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute('DROP TABLE IF EXISTS wastes')
+        connection.execute(SQLITE_SCHEMA)
+        for chunk in iter_frames(rows, chunk_size, seed):
+            for col in ['created_at', 'updated_at']:
+                chunk[col] = chunk[col].astype(str)
+            chunk.rename(columns=TABLE_COLUMNS).to_sql('wastes', connection, if_exists='append', index=False)
+        for col in SQLITE_INDEXES:
+            connection.execute(f'CREATE INDEX wastes_{col.lower()}_index ON wastes ({col})')
+        connection.commit()
+    finally:
+        connection.close()
@@ -0,0 +1,34 @@
+# gunicorn.conf.py - multi-worker serving for the ML analytics API
+#
+#   cd resources/py && gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get('ML_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('ML_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+# Each open /api/ml/stream client holds a thread for as long as it is connected.
+# The app caps streams at half of these threads per worker
+# (ML_STREAM_MAX_CLIENTS overrides that), so 16 threads leave 8 streams per
+# worker next to the API. Idle stream threads only wait on a queue; raise
+# ML_THREADS to serve more dashboards, or serve /api/ml/stream from a separate
+# gunicorn with an async worker class such as gevent.
+threads = int(os.environ.get('ML_THREADS', 16))
+timeout = int(os.environ.get('ML_WORKER_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('ML_GRACEFUL_TIMEOUT', 30))
+
+# Import app, models and data once in the master; workers inherit them copy-on-write
+preload_app = True
+
+def pre_fork(server, worker):
+    from app import before_fork
+    before_fork()
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork()
+
+def post_worker_init(worker):
+    # Runs before the worker accepts connections, so it only serves once warm
+    from app import warm_up_worker
+    warm_up_worker()
@@ -0,0 +1,19 @@
+# wsgi.py - production entry point for the ML analytics API
+#
+# Linux:   gunicorn -c gunicorn.conf.py wsgi:app   (run from resources/py)
+# Windows: waitress-serve --port=5000 wsgi:app
+#
+# Importing this module warms up models, data and the first analytics snapshot.
+# With gunicorn's preload_app that happens once in the master process and the
+# forked workers share the loaded state copy-on-write.
+import sys
+
+from app import app, warm_up, warm_up_worker
+
+warm_up()
+
+# gunicorn finishes each worker in post_worker_init, after the fork; a
+# single-process server like waitress serves from this process, so it starts
+# the background jobs and reports ready here
+if 'gunicorn' not in sys.modules:
+    warm_up_worker()
@@ -0,0 +1,123 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\User;
+use App\Models\Waste;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Http\Client\ConnectionException;
+use Illuminate\Http\Client\Request;
+use Illuminate\Support\Facades\Http;
+use Tests\TestCase;
+
+class WasteMlServiceTest extends TestCase
+{
+    use RefreshDatabase;
+
+    private array $item = [
+        'TypeOfWaste' => 'Plastic',
+        'Disposition' => 'Recycled',
+        'Weight' => 2.5,
+        'Unit' => 'kg',
+        'InputBy' => 'Test User',
+    ];
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        config([
+            'services.ml.url' => 'http://ml.test',
+            'services.ml.token' => 'secret',
+        ]);
+
+        // Run the change notification inline instead of after the response
+        $this->withoutDefer();
+        // These tests cover the calls to the ML service, not the routes' access rules
+        $this->withoutMiddleware();
+        $this->actingAs(User::factory()->create(['permission_level' => 'edit']));
+    }
+
+    private function fakeMlService(): void
+    {
+        Http::fake([
+            'ml.test/api/ml/changes' => Http::response(['success' => true]),
+            'ml.test/api/ml/anomalies/score' => Http::response([
+                'success' => true,
+                'results' => [['id' => 1, 'anomaly_score' => 0.1, 'is_anomaly' => false, 'reason' => null]],
+            ]),
+        ]);
+    }
+
+    private function assertChangesSent(array $upserted, array $deleted): void
+    {
+        Http::assertSent(fn (Request $request) => $request->url() === 'http://ml.test/api/ml/changes'
+            && $request->hasHeader('X-ML-Token', 'secret')
+            && $request['upserted'] === $upserted
+            && $request['deleted'] === $deleted);
+    }
+
+    public function test_store_notifies_changes_and_returns_scores(): void
+    {
+        $this->fakeMlService();
+
+        $response = $this->postJson('/wastes', $this->item);
+
+        $response->assertCreated()->assertJsonPath('anomalies.0.is_anomaly', false);
+        $this->assertChangesSent([$response->json('data.id')], []);
+        Http::assertSent(fn (Request $request) => $request->url() === 'http://ml.test/api/ml/anomalies/score'
+            && $request['records'][0]['TypeOfWaste'] === 'Plastic');
+    }
+
+    public function test_bulk_store_notifies_every_created_id(): void
+    {
+        $this->fakeMlService();
+
+        $response = $this->postJson('/wastes', ['items' => [$this->item, $this->item]]);
+
+        $response->assertCreated();
+        $this->assertChangesSent(array_column($response->json('data'), 'id'), []);
+    }
+
+    public function test_update_notifies_changes(): void
+    {
+        $this->fakeMlService();
+        $waste = Waste::create($this->item);
+
+        $this->putJson("/wastes/{$waste->id}", ['Weight' => 4] + $this->item)->assertOk();
+
+        $this->assertChangesSent([$waste->id], []);
+    }
+
+    public function test_destroy_notifies_changes(): void
+    {
+        $this->fakeMlService();
+        $waste = Waste::create($this->item);
+
+        $this->deleteJson("/wastes/{$waste->id}")->assertOk();
+
+        $this->assertChangesSent([], [$waste->id]);
+    }
+
+    public function test_store_succeeds_when_the_ml_service_fails(): void
+    {
+        Http::fake(['ml.test/*' => Http::response(['success' => false], 500)]);
+
+        $this->postJson('/wastes', $this->item)
+            ->assertCreated()
+            ->assertJsonPath('anomalies', null);
+
+        $this->assertDatabaseCount('wastes', 1);
+    }
+
+    public function test_store_succeeds_when_the_ml_service_is_unreachable(): void
+    {
+        Http::fake(fn () => throw new ConnectionException('ML service down'));
+
+        $this->postJson('/wastes', $this->item)
+            ->assertCreated()
+            ->assertJsonPath('anomalies', null);
+
+        $this->assertDatabaseCount('wastes', 1);
+    }
+}